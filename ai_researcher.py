@@ -1,62 +1,212 @@
-from typing_extensions import TypedDict
-from typing import Annotated,Literal
-from langgraph.graph.message import add_messages
+# Heavy dependencies (langgraph, langchain_groq, PyPDF2, the tool modules) are
+# imported on first use, so importing this module stays cheap. Use get_graph()
+# for the shared compiled graph, or build_graph() for one with a custom model.
+import os
+import threading
+from functools import lru_cache, wraps
+from typing import Literal
 from dotenv import load_dotenv
 
 load_dotenv()
 
-class State(TypedDict):
-    messages: Annotated[list, add_messages] 
-    
-    
-    
-from arxiv_tool import *
-from read_pdf import *
-from write_pdf import *
-from langgraph.prebuilt import ToolNode
+# Maximum graph steps per turn (compact + agent + tools per round)
+RECURSION_LIMIT = 40
+
+# lru_cache alone lets concurrent first callers each build their own object
+# (e.g. two checkpointers splitting sessions); reentrant, as getters call getters
+_build_lock = threading.RLock()
+
+
+def _build_once(func):
+    """Cache a zero-argument builder so that it runs once, even under concurrent first calls."""
+    cached = lru_cache(maxsize=None)(func)
+
+    @wraps(func)
+    def wrapper():
+        with _build_lock:
+            return cached()
+
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+@_build_once
+def get_state_schema():
+    from typing import Annotated
+    from typing_extensions import TypedDict
+    from langgraph.graph.message import add_messages
+
+    class State(TypedDict):
+        messages: Annotated[list, add_messages]
+
+    return State
+
+
+@_build_once
+def get_tools() -> list:
+    from arxiv_tool import arxiv_search
+    from read_pdf import read_pdf, read_pdf_sections
+    from write_pdf import render_latex_pdf
+    from paper_index import search_local_papers
+    return [read_pdf,read_pdf_sections,render_latex_pdf,arxiv_search,search_local_papers]
+
+
+@_build_once
+def get_model():
+    from langchain_groq.chat_models import ChatGroq
+    return ChatGroq(model="openai/gpt-oss-120b",api_key=os.getenv("GROQ_API_KEY")).bind_tools(get_tools())
+
+
+@_build_once
+def get_checkpointer():
+    from checkpoints import create_checkpointer
+    return create_checkpointer()
+
+
+@_build_once
+def get_thread_tracker():
+    from checkpoints import ThreadTracker, CHECKPOINTER, CHECKPOINT_DB, SESSION_TTL, MAX_SESSIONS
+    return ThreadTracker(
+        get_checkpointer(), SESSION_TTL, MAX_SESSIONS,
+        db_path=CHECKPOINT_DB if CHECKPOINTER == "sqlite" else None,
+    )
+
+
+def build_graph(model=None, tools=None, checkpointer=None, cache=None):
+    """Compile the agent graph.
+
+    Args:
+        model: Chat model with tools bound; defaults to the Groq model.
+        tools: Tools the graph can call; defaults to get_tools().
+        checkpointer: LangGraph checkpointer; defaults to get_checkpointer().
+        cache: LLMCache for model responses; defaults to the shared cache when
+               LLM_CACHE=1. Pass False to disable it.
+    """
+    from langgraph.graph import END,START,StateGraph
+    from langchain_core.runnables import RunnableLambda
+    from compaction import compact_messages
+    from tool_runner import make_tool_node
+    from llm_cache import LLM_CACHE, llm_cache, cache_enabled
+    from telemetry import LLM_CACHE_LOOKUPS
+
+    State = get_state_schema()
+    tools = tools if tools is not None else get_tools()
+    model = model if model is not None else get_model()
+    checkpointer = checkpointer if checkpointer is not None else get_checkpointer()
+    if cache is None:
+        cache = llm_cache if LLM_CACHE else False
+
+    def cached_response(messages, config):
+        # Returns (cache key or None, cached response or None)
+        if not cache or not cache_enabled(config):
+            return None, None
+        key = cache.key(messages, model)
+        response = cache.lookup(key)
+        LLM_CACHE_LOOKUPS.inc(result="hit" if response is not None else "miss")
+        return key, response
+
+    def call_model(state:State, config):
+        messages=state["messages"]
+        key, response = cached_response(messages, config)
+        if response is None:
+            response=model.invoke(messages)
+            if key:
+                cache.store(key, response)
+        return {"messages":[response]}
+
+    async def acall_model(state:State, config):
+        messages=state["messages"]
+        key, response = cached_response(messages, config)
+        if response is None:
+            response=await model.ainvoke(messages)
+            if key:
+                cache.store(key, response)
+        return {"messages":[response]}
+
+    def compact_history(state:State):
+        # Replace stale paper texts / LaTeX bodies with short references once the
+        # conversation exceeds its token budget; replacements keep their message ids
+        replacements=compact_messages(state["messages"])
+        if replacements:
+            print(f"Compacted {len(replacements)} old messages")
+        return {"messages":replacements}
+
+    def should_continue(state: State) -> Literal["tools", END]:
+        messages = state["messages"]
+        last_message = messages[-1]
+        if last_message.tool_calls:
+            return "tools"
+        return END
+
+    workflow = StateGraph(State)
+    # Sync and async implementations so the graph can be driven by stream() or astream()
+    workflow.add_node("agent", RunnableLambda(call_model, afunc=acall_model))
+    # Runs all tool calls of a turn concurrently, each with its own timeout
+    workflow.add_node("tools", make_tool_node(tools))
+    workflow.add_node("compact", compact_history)
+    workflow.add_edge(START, "compact")
+    workflow.add_edge("compact", "agent")
+    workflow.add_conditional_edges("agent", should_continue)
+    workflow.add_edge("tools", "compact")
+
+    return workflow.compile(checkpointer=checkpointer)
+
+
+@_build_once
+def get_graph():
+    """The shared compiled graph, built on first use."""
+    return build_graph()
+
+
+# Lazily resolved module attributes, kept for `from ai_researcher import graph` etc.
+_LAZY_ATTRIBUTES = {
+    "graph": get_graph,
+    "models": get_model,
+    "tools": get_tools,
+    "checkpointer": get_checkpointer,
+    "thread_tracker": get_thread_tracker,
+    "State": get_state_schema,
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _session_config(thread_id: str, use_llm_cache: bool) -> dict:
+    from telemetry import metrics_handler
+    return {"configurable": {"thread_id": thread_id, "llm_cache": use_llm_cache},
+            "recursion_limit": RECURSION_LIMIT,
+            "callbacks": [metrics_handler, get_thread_tracker().turn_handler(thread_id)]}
+
+
+def session_config(session_id: str, use_llm_cache: bool = True) -> dict:
+    """Graph config with a thread of its own for a chat session; marks a turn as started.
+
+    Set use_llm_cache=False to always call the model, even when LLM_CACHE=1.
+    """
+    thread_id = f"session-{session_id}"
+    get_thread_tracker().touch(thread_id)
+    return _session_config(thread_id, use_llm_cache)
+
+
+async def asession_config(session_id: str, use_llm_cache: bool = True) -> dict:
+    """Async version of session_config; evicted threads are deleted without blocking the loop."""
+    thread_id = f"session-{session_id}"
+    await get_thread_tracker().atouch(thread_id)
+    return _session_config(thread_id, use_llm_cache)
+
+
+def reset_session(session_id: str):
+    """Delete the stored conversation of a chat session."""
+    get_thread_tracker().forget(f"session-{session_id}")
+
 
-tools=[read_pdf,render_latex_pdf,arxiv_search]
-tool_node=ToolNode(tools)
-
-import os 
-from langchain_groq.chat_models import ChatGroq
-
-models=ChatGroq(model="openai/gpt-oss-120b",api_key=os.getenv("GROQ_API_KEY")).bind_tools(tools)
-
-
-from langgraph.graph import END,START,StateGraph
-
-
-
-def call_model(state:State):
-    messages=state["messages"]
-    response=models.invoke(messages)
-    return {"messages":[response]}
-
-def should_continue(state: State) -> Literal["tools", END]:
-    messages = state["messages"]
-    last_message = messages[-1]
-    if last_message.tool_calls:
-        return "tools"
-    return END
-
-
-
-workflow = StateGraph(State)
-workflow.add_node("agent", call_model)
-workflow.add_node("tools", tool_node)
-workflow.add_edge(START, "agent")
-workflow.add_conditional_edges("agent", should_continue)
-workflow.add_edge("tools", "agent")
-
-
-
-
-from langgraph.checkpoint.memory import MemorySaver
-checkpointer = MemorySaver()
-config = {"configurable": {"thread_id": 222222}, "recursion_limit": 25}  # Limit to 25 iterations
-
-graph = workflow.compile(checkpointer=checkpointer)
+async def areset_session(session_id: str):
+    """Async version of reset_session."""
+    await get_thread_tracker().aforget(f"session-{session_id}")
 
 
 
@@ -72,19 +222,21 @@ research paper. For research information or getting papers, ALWAYS use arxiv.org
 You will use the tools provided to search for papers, read them, and write a new
 paper based on the ideas you find.
 
-IMPORTANT: You have access to ONLY these three tools:
+IMPORTANT: You have access to ONLY these five tools:
 1. arxiv_search(topic: str) - Search for papers on arXiv. Use simple keywords without quotes or special characters.
-2. read_pdf(url: str) - Read and extract text from a PDF given its URL.
-3. render_latex_pdf(latex_content: str) - Render LaTeX content to a PDF file. YOU MUST USE THIS TOOL to generate PDFs.
+2. read_pdf_sections(url: str, sections: str) - Read the key sections (abstract, introduction, method, conclusion) of a PDF given its URL. Call it again with the same URL and e.g. sections="results, discussion" to read more.
+3. read_pdf(url: str) - Read and extract the full text from a PDF given its URL. Only use this if the sections are not enough.
+4. render_latex_pdf(latex_content: str) - Render LaTeX content to a PDF file. YOU MUST USE THIS TOOL to generate PDFs.
+5. search_local_papers(query: str) - Search the papers that were already found or read in earlier sessions. Fast; try it before arxiv_search when a topic or paper comes up again.
 
-Do NOT attempt to use any other tools. Only use the three tools listed above.
+Do NOT attempt to use any other tools. Only use the five tools listed above.
 
 WORKFLOW:
 1. First, ask me what topic I want to research.
 2. Call arxiv_search ONCE with simple keywords (e.g., "machine learning" or "neural networks").
 3. Present the papers found to me (DO NOT search again unless I ask for different results).
 4. Wait for me to choose a paper.
-5. Read the chosen paper using read_pdf.
+5. Read the chosen paper using read_pdf_sections.
 6. Discuss the paper with me and suggest research ideas.
 7. When I ask you to write a paper, use render_latex_pdf to generate the PDF.
 
@@ -155,12 +307,3 @@ Remember:
 - Search arxiv ONCE, then STOP and present results
 - ALWAYS use render_latex_pdf tool to generate PDFs
 - Never show LaTeX code as plain text"""
-
-
-
-
-def print_stream(stream):
-    for s in stream:
-        message = s["messages"][-1]
-        print(f"Message received: {message.content[:200]}...")
-        message.pretty_print()
\ No newline at end of file
@@ -1,10 +1,12 @@
 from flask import Flask, render_template, request, jsonify, send_file, Response
-from ai_researcher import INITIAL_PROMPT, graph, config
+from ai_researcher import get_graph
+from chat_service import (
+    start_turn, clear_chat_history, chunk_events, stream_events, sse, STREAM_MODES,
+)
+from telemetry import trace, render_metrics
 from pathlib import Path
 import logging
-import json
 import os
-from langchain_core.messages import AIMessage
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -12,15 +14,6 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Store chat history in memory (for production, use a database or session)
-chat_sessions = {}
-
-def get_chat_history(session_id):
-    """Get or create chat history for a session."""
-    if session_id not in chat_sessions:
-        chat_sessions[session_id] = []
-    return chat_sessions[session_id]
-
 
 @app.route('/')
 def index():
@@ -41,16 +34,9 @@ def chat():
         
         logger.info(f"User input: {user_message}")
         
-        # Get chat history for this session
-        chat_history = get_chat_history(session_id)
-        chat_history.append({"role": "user", "content": user_message})
-        
-        # Prepare input for the agent
-        chat_input = {
-            "messages": [
-                {"role": "system", "content": INITIAL_PROMPT}
-            ] + chat_history
-        }
+        # Only the new message is sent; the session's graph thread holds the history
+        chat_input, config = start_turn(
+            session_id, user_message, use_llm_cache=data.get('cache', True) is not False)
         
         logger.info("Starting agent processing...")
         
@@ -59,56 +45,27 @@ def chat():
         tool_calls_made = []
         pdf_path = None
         
-        for chunk in graph.stream(chat_input, config, stream_mode="updates"):
-            logger.info(f"Received chunk with keys: {chunk.keys()}")
-            
-            # Check for agent node updates
-            if "agent" in chunk:
-                agent_output = chunk["agent"]
-                if "messages" in agent_output:
-                    messages = agent_output["messages"]
-                    for message in messages:
-                        # Handle tool calls
-                        if hasattr(message, "tool_calls") and message.tool_calls:
-                            for tool_call in message.tool_calls:
-                                logger.info(f"Tool call: {tool_call['name']}")
-                                tool_calls_made.append(tool_call['name'])
-                        
-                        # Handle assistant response
-                        if isinstance(message, AIMessage) and message.content:
-                            if isinstance(message.content, str):
-                                text_content = message.content
-                            elif isinstance(message.content, list):
-                                text_content = "".join(
-                                    block.get("text", "") if isinstance(block, dict) else str(block)
-                                    for block in message.content
-                                )
-                            else:
-                                text_content = str(message.content)
-                            
-                            if text_content.strip():
-                                full_response = text_content
-            
-            # Check for tools node updates
-            if "tools" in chunk:
-                tools_output = chunk["tools"]
-                if "messages" in tools_output:
-                    for msg in tools_output["messages"]:
-                        # Check if a PDF was generated
-                        if hasattr(msg, "content") and msg.content:
-                            content = msg.content
-                            if isinstance(content, str) and content.endswith('.pdf'):
-                                pdf_path = content
-                                logger.info(f"PDF generated: {pdf_path}")
-        
-        # Add response to history
-        if full_response:
-            chat_history.append({"role": "assistant", "content": full_response})
+        with trace(route='/chat', session_id=session_id) as turn_trace:
+            for chunk in get_graph().stream(chat_input, config, stream_mode="updates"):
+                logger.info(f"Received chunk with keys: {chunk.keys()}")
+                
+                for event in chunk_events(chunk):
+                    if event['type'] == 'tool_call':
+                        logger.info(f"Tool call: {event['name']}")
+                        tool_calls_made.append(event['name'])
+                    elif event['type'] == 'content':
+                        full_response = event['content']
+                    elif event['type'] == 'pdf':
+                        pdf_path = event['path']
+                        logger.info(f"PDF generated: {pdf_path}")
         
         response_data = {
             'response': full_response,
             'tool_calls': tool_calls_made,
         }
+        # Per-request timeline of nodes, tools and stages, on request
+        if data.get('trace'):
+            response_data['trace'] = turn_trace.to_dict()
         
         # If a PDF was generated, include the download path
         if pdf_path and os.path.exists(pdf_path):
@@ -135,70 +92,24 @@ def chat_stream():
         
         logger.info(f"User input: {user_message}")
         
-        # Get chat history for this session
-        chat_history = get_chat_history(session_id)
-        chat_history.append({"role": "user", "content": user_message})
-        
-        # Prepare input for the agent
-        chat_input = {
-            "messages": [
-                {"role": "system", "content": INITIAL_PROMPT}
-            ] + chat_history
-        }
+        # Only the new message is sent; the session's graph thread holds the history
+        chat_input, config = start_turn(
+            session_id, user_message, use_llm_cache=data.get('cache', True) is not False)
         
         def generate():
-            full_response = ""
-            pdf_path = None
-            
             try:
-                for chunk in graph.stream(chat_input, config, stream_mode="updates"):
-                    # Check for agent node updates
-                    if "agent" in chunk:
-                        agent_output = chunk["agent"]
-                        if "messages" in agent_output:
-                            messages = agent_output["messages"]
-                            for message in messages:
-                                # Handle tool calls
-                                if hasattr(message, "tool_calls") and message.tool_calls:
-                                    for tool_call in message.tool_calls:
-                                        yield f"data: {json.dumps({'type': 'tool_call', 'name': tool_call['name']})}\n\n"
-                                
-                                # Handle assistant response
-                                if isinstance(message, AIMessage) and message.content:
-                                    if isinstance(message.content, str):
-                                        text_content = message.content
-                                    elif isinstance(message.content, list):
-                                        text_content = "".join(
-                                            block.get("text", "") if isinstance(block, dict) else str(block)
-                                            for block in message.content
-                                        )
-                                    else:
-                                        text_content = str(message.content)
-                                    
-                                    if text_content.strip():
-                                        full_response = text_content
-                                        yield f"data: {json.dumps({'type': 'content', 'content': text_content})}\n\n"
-                    
-                    # Check for tools node updates
-                    if "tools" in chunk:
-                        tools_output = chunk["tools"]
-                        if "messages" in tools_output:
-                            for msg in tools_output["messages"]:
-                                if hasattr(msg, "content") and msg.content:
-                                    content = msg.content
-                                    if isinstance(content, str) and content.endswith('.pdf'):
-                                        pdf_path = content
-                                        yield f"data: {json.dumps({'type': 'pdf', 'filename': os.path.basename(pdf_path)})}\n\n"
-                
-                # Add response to history
-                if full_response:
-                    chat_history.append({"role": "assistant", "content": full_response})
+                with trace(route='/chat/stream', session_id=session_id) as turn_trace:
+                    stream = get_graph().stream(chat_input, config, stream_mode=STREAM_MODES)
+                    for event in stream_events(stream):
+                        yield sse(event)
                 
-                yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                if data.get('trace'):
+                    yield sse({'type': 'trace', 'trace': turn_trace.to_dict()})
+                yield sse({'type': 'done'})
                 
             except Exception as e:
                 logger.error(f"Error during streaming: {str(e)}", exc_info=True)
-                yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+                yield sse({'type': 'error', 'message': str(e)})
         
         return Response(generate(), mimetype='text/event-stream')
     
@@ -235,6 +146,12 @@ def download_pdf(filename):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/metrics')
+def metrics():
+    """Expose latency, payload and token metrics in Prometheus format."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/clear', methods=['POST'])
 def clear_history():
     """Clear chat history for a session."""
@@ -242,8 +159,7 @@ def clear_history():
         data = request.json
         session_id = data.get('session_id', 'default')
         
-        if session_id in chat_sessions:
-            chat_sessions[session_id] = []
+        clear_chat_history(session_id)
         
         return jsonify({'status': 'success'})
     
@@ -1,21 +1,31 @@
 import os 
 
 # Step1: Access arXiv using URL
-import requests
+import http_client
+from paper_index import paper_index
+from telemetry import timed
 import re
+import copy
+import time
+import threading
+from concurrent.futures import Future
 
 
-def search_arxiv_papers(topic: str, max_results: int = 5) -> dict:
-    """Search arXiv for papers on a given topic.
-    
-    Args:
-        topic: The search topic/query
-        max_results: Maximum number of results to return
-        
-    Returns:
-        Dictionary containing list of paper entries
-    """
-    # Clean the query - remove problematic characters
+# Search results are cached per (cleaned query, max_results) for this many seconds
+SEARCH_CACHE_TTL = float(os.getenv("ARXIV_CACHE_TTL", "900"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("ARXIV_CACHE_MAX_ENTRIES", "256"))
+# "relevance" fetches the ARXIV_RERANK_POOL newest matches and returns the best
+# BM25 matches among them; "recent" keeps arXiv's newest-first order
+ARXIV_RANKING = os.getenv("ARXIV_RANKING", "relevance")
+ARXIV_RERANK_POOL = int(os.getenv("ARXIV_RERANK_POOL", "100"))
+
+_search_cache = {}
+_inflight_searches = {}
+_search_lock = threading.Lock()
+
+
+def clean_query(topic: str) -> str:
+    """Turn a free-form topic into an arXiv API search query."""
     query = topic.strip()
     
     # Remove quotes, parentheses, and other special characters
@@ -30,12 +40,96 @@ def search_arxiv_papers(topic: str, max_results: int = 5) -> dict:
     
     # Remove any remaining problematic characters
     query = re.sub(r'[^\w\+\-]', '', query)
+    return query
+
+
+def search_arxiv_papers(topic: str, max_results: int = 5, ranking: str = ARXIV_RANKING) -> dict:
+    """Search arXiv for papers on a given topic.
+    
+    Results are cached for SEARCH_CACHE_TTL seconds, and concurrent identical
+    searches share a single upstream request.
+    
+    Args:
+        topic: The search topic/query
+        max_results: Maximum number of results to return
+        ranking: "relevance" to re-rank an over-fetched pool by BM25 score
+                 (entries get a "score"), or "recent" for newest first
+        
+    Returns:
+        Dictionary containing list of paper entries
+    """
+    # Clean the query - remove problematic characters
+    query = clean_query(topic)
     
     print(f"Cleaned query: {query}")
     
     if not query:
         raise ValueError("Query is empty after cleaning")
     
+    key = (query.lower(), max_results, ranking)
+    with _search_lock:
+        cached = _search_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            print(f"Using cached arXiv results for: {query}")
+            return copy.deepcopy(cached[1])
+        future = _inflight_searches.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight_searches[key] = future
+    
+    if not owner:
+        print(f"Waiting for in-flight arXiv search for: {query}")
+        return copy.deepcopy(future.result())
+    
+    try:
+        from near_duplicates import duplicate_tracker
+        # Other versions and near-identical abstracts are folded into one entry
+        if ranking == "relevance":
+            from relevance import rank_papers
+            pool = _fetch_arxiv_papers(query, max(max_results, ARXIV_RERANK_POOL))
+            data = {"entries": rank_papers(query, duplicate_tracker.collapse(pool["entries"]), max_results)}
+        else:
+            pool = _fetch_arxiv_papers(query, max_results)
+            data = {"entries": duplicate_tracker.collapse(pool["entries"])}
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(data)
+        try:
+            # The whole pool is indexed, so search_local_papers can find the runners-up
+            paper_index.add_papers(pool["entries"])
+        except Exception as e:
+            print(f"Could not index arXiv results: {str(e)}")
+        with _search_lock:
+            _search_cache[key] = (time.monotonic() + SEARCH_CACHE_TTL, data)
+            if len(_search_cache) > SEARCH_CACHE_MAX_ENTRIES:
+                # Dicts keep insertion order, so the first key is the oldest entry
+                del _search_cache[next(iter(_search_cache))]
+        return copy.deepcopy(data)
+    finally:
+        with _search_lock:
+            _inflight_searches.pop(key, None)
+
+
+def _fetch_arxiv_papers(query: str, max_results: int) -> dict:
+    """Query the arXiv API for an already cleaned query."""
+    return {"entries": list(_stream_arxiv_entries(query, max_results))}
+
+
+def iter_arxiv_papers(topic: str, max_results: int = 100):
+    """Yield papers for a topic as they are parsed off the wire.
+
+    Intended for large batch sweeps; results are not cached.
+    """
+    query = clean_query(topic)
+    if not query:
+        raise ValueError("Query is empty after cleaning")
+    yield from _stream_arxiv_entries(query, max_results)
+
+
+def _stream_arxiv_entries(query: str, max_results: int):
     url = (
         "http://export.arxiv.org/api/query"
         f"?search_query=all:{query}"
@@ -44,67 +138,103 @@ def search_arxiv_papers(topic: str, max_results: int = 5) -> dict:
         "&sortOrder=descending"
     )
     print(f"Making request to arXiv API: {url}")
-    resp = requests.get(url)
-    
-    if not resp.ok:
-        print(f"ArXiv API request failed: {resp.status_code} - {resp.text}")
-        raise ValueError(f"Bad response from arXiv API: {resp}\n{resp.text}")
-    
-    data = parse_arxiv_xml(resp.text)
-    return data
+    with timed("arxiv_fetch"), http_client.stream(url) as resp:
+        if not resp.ok:
+            print(f"ArXiv API request failed: {resp.status_code} - {resp.text}")
+            raise ValueError(f"Bad response from arXiv API: {resp}\n{resp.text}")
+        
+        yield from iter_arxiv_entries(resp.iter_content(chunk_size=64 * 1024))
 
 
 # Step2: Parse XML
 import xml.etree.ElementTree as ET
-def parse_arxiv_xml(xml_content: str) -> dict:
-    """Parse the XML content from arXiv API response."""
 
-    entries = []
-    ns = {
-        "atom": "http://www.w3.org/2005/Atom",
-        "arxiv": "http://arxiv.org/schemas/atom"
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV = "{http://arxiv.org/schemas/atom}"
+
+
+def _parse_entry(entry: ET.Element) -> dict:
+    """Extract the fields of one Atom <entry> in a single pass over its children."""
+    paper = {
+        "id": None,
+        "title": None,
+        "summary": "",
+        "authors": [],
+        "categories": [],
+        "primary_category": None,
+        "published": None,
+        "updated": None,
+        "pdf": None,
     }
-    root = ET.fromstring(xml_content)
-    # Loop through each <entry> in Atom namespace
-    for entry in root.findall("atom:entry", ns):
-        # Extract authors
-        authors = [
-            author.findtext("atom:name", namespaces=ns)
-            for author in entry.findall("atom:author", ns)
-        ]
-        
-        # Extract categories (term attribute)
-        categories = [
-            cat.attrib.get("term")
-            for cat in entry.findall("atom:category", ns)
-        ]
-        
-        # Extract PDF link (rel="related" and type="application/pdf")
-        pdf_link = None
-        for link in entry.findall("atom:link", ns):
-            if link.attrib.get("type") == "application/pdf":
-                pdf_link = link.attrib.get("href")
-                break
+    for child in entry:
+        tag = child.tag
+        if tag == ATOM + "id":
+            # e.g. http://arxiv.org/abs/2401.01234v2 -> 2401.01234v2
+            paper["id"] = (child.text or "").strip().rsplit("/abs/", 1)[-1]
+        elif tag == ATOM + "title":
+            paper["title"] = child.text
+        elif tag == ATOM + "summary":
+            paper["summary"] = (child.text or "").strip()
+        elif tag == ATOM + "author":
+            paper["authors"].append(child.findtext(ATOM + "name"))
+        elif tag == ATOM + "category":
+            paper["categories"].append(child.attrib.get("term"))
+        elif tag == ARXIV + "primary_category":
+            paper["primary_category"] = child.attrib.get("term")
+        elif tag == ATOM + "published":
+            paper["published"] = child.text
+        elif tag == ATOM + "updated":
+            paper["updated"] = child.text
+        elif tag == ATOM + "link":
+            # PDF link (rel="related" and type="application/pdf")
+            if paper["pdf"] is None and child.attrib.get("type") == "application/pdf":
+                paper["pdf"] = child.attrib.get("href")
+    return paper
+
 
-        entries.append({
-            "title": entry.findtext("atom:title", namespaces=ns),
-            "summary": entry.findtext("atom:summary", namespaces=ns).strip(),
-            "authors": authors,
-            "categories": categories,
-            "pdf": pdf_link
-        })
+def iter_arxiv_entries(chunks):
+    """Incrementally parse an arXiv Atom feed, yielding entry dicts as they arrive.
 
-    return {"entries": entries}
+    Args:
+        chunks: The feed as a string/bytes, or an iterable of string/bytes chunks
+                (e.g. ``response.iter_content()``).
+
+    Processed elements are discarded, so memory stays flat regardless of
+    how many entries the feed contains.
+    """
+    if isinstance(chunks, (str, bytes)):
+        chunks = [chunks]
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == ATOM + "entry":
+                yield _parse_entry(elem)
+                elem.clear()
+                if root is not None:
+                    root.remove(elem)
+    parser.close()
+
+
+def parse_arxiv_xml(xml_content: str) -> dict:
+    """Parse the XML content from arXiv API response."""
+    return {"entries": list(iter_arxiv_entries(xml_content))}
 
 
 
 # Step3: Convert the functionality into a tool
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 
 
 @tool
-def arxiv_search(topic: str) -> list[dict]:
-    """Search for recently uploaded arXiv papers.
+def arxiv_search(topic: str, config: RunnableConfig = None) -> list[dict]:
+    """Search for recently uploaded arXiv papers, most relevant first.
 
     Args:
         topic: The topic to search for papers about. Use simple keywords separated by spaces.
@@ -112,7 +242,9 @@ def arxiv_search(topic: str) -> list[dict]:
                Example: "large language models" or "neural networks transformers"
 
     Returns:
-        List of papers with their metadata including title, authors, summary, etc.
+        List of papers with their metadata including title, authors, summary,
+        and a relevance score. Near-duplicate papers are listed under
+        "duplicates"; "already_read" marks papers (nearly) read before.
     """
     print("ARXIV Agent called")
     print(f"Searching arXiv for papers about: {topic}")
@@ -121,4 +253,10 @@ def arxiv_search(topic: str) -> list[dict]:
         print(f"No papers found for topic: {topic}")
         return {"entries": [], "message": f"No papers found for topic: {topic}. Try different keywords."}
     print(f"Found {len(papers['entries'])} papers about {topic}")
+    from near_duplicates import duplicate_tracker, thread_of
+    thread = thread_of(config)
+    for entry in papers["entries"]:
+        read = duplicate_tracker.already_read(thread, entry)
+        if read:
+            entry["already_read"] = read
     return papers
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""Async (ASGI) serving mode for the research agent.
+
+Serves the same routes as app.py, but drives the LangGraph graph with
+``astream`` so a single process can hold many concurrent chat sessions
+without tying up one worker per in-flight request. Blocking tools run on
+the shared tool pool (see tool_runner), off the event loop.
+
+Run with:  hypercorn asgi_app:app --bind 0.0.0.0:8000
+"""
+from quart import Quart, render_template, request, jsonify, send_file, Response
+from ai_researcher import get_graph, get_thread_tracker
+from chat_service import (
+    astart_turn, aclear_chat_history, chunk_events, astream_events, sse, STREAM_MODES,
+)
+from telemetry import trace, render_metrics
+from pathlib import Path
+import asyncio
+import logging
+import os
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = Quart(__name__)
+
+
+@app.before_serving
+async def warm_up():
+    """Build the graph and session tracker before the first request, off the event loop."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, get_graph)
+    await loop.run_in_executor(None, get_thread_tracker)
+
+
+@app.route('/')
+async def index():
+    """Serve the main chat interface."""
+    return await render_template('index.html')
+
+
+@app.route('/chat', methods=['POST'])
+async def chat():
+    """Handle chat messages and return AI response."""
+    try:
+        data = await request.get_json()
+        user_message = data.get('message', '')
+        session_id = data.get('session_id', 'default')
+
+        if not user_message:
+            return jsonify({'error': 'No message provided'}), 400
+
+        logger.info(f"User input: {user_message}")
+
+        # Only the new message is sent; the session's graph thread holds the history
+        chat_input, config = await astart_turn(
+            session_id, user_message, use_llm_cache=data.get('cache', True) is not False)
+
+        full_response = ""
+        tool_calls_made = []
+        pdf_path = None
+
+        with trace(route='/chat', session_id=session_id) as turn_trace:
+            async for chunk in get_graph().astream(chat_input, config, stream_mode="updates"):
+                for event in chunk_events(chunk):
+                    if event['type'] == 'tool_call':
+                        logger.info(f"Tool call: {event['name']}")
+                        tool_calls_made.append(event['name'])
+                    elif event['type'] == 'content':
+                        full_response = event['content']
+                    elif event['type'] == 'pdf':
+                        pdf_path = event['path']
+                        logger.info(f"PDF generated: {pdf_path}")
+
+        response_data = {
+            'response': full_response,
+            'tool_calls': tool_calls_made,
+        }
+        if data.get('trace'):
+            response_data['trace'] = turn_trace.to_dict()
+        if pdf_path and os.path.exists(pdf_path):
+            response_data['pdf_available'] = True
+            response_data['pdf_filename'] = os.path.basename(pdf_path)
+
+        return jsonify(response_data)
+
+    except Exception as e:
+        logger.error(f"Error during agent processing: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Handle chat messages with streaming response."""
+    data = await request.get_json()
+    user_message = data.get('message', '')
+    session_id = data.get('session_id', 'default')
+
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    logger.info(f"User input: {user_message}")
+
+    # Only the new message is sent; the session's graph thread holds the history
+    chat_input, config = await astart_turn(
+        session_id, user_message, use_llm_cache=data.get('cache', True) is not False)
+
+    async def generate():
+        try:
+            with trace(route='/chat/stream', session_id=session_id) as turn_trace:
+                stream = get_graph().astream(chat_input, config, stream_mode=STREAM_MODES)
+                async for event in astream_events(stream):
+                    yield sse(event)
+
+            if data.get('trace'):
+                yield sse({'type': 'trace', 'trace': turn_trace.to_dict()})
+            yield sse({'type': 'done'})
+
+        except Exception as e:
+            logger.error(f"Error during streaming: {str(e)}", exc_info=True)
+            yield sse({'type': 'error', 'message': str(e)})
+
+    response = Response(generate(), mimetype='text/event-stream')
+    # Stream for as long as the agent runs
+    response.timeout = None
+    return response
+
+
+@app.route('/download/<filename>')
+async def download_pdf(filename):
+    """Download a generated PDF file."""
+    pdf_path = Path("output") / filename
+    if not pdf_path.exists():
+        pdf_path = Path(filename)
+    if not pdf_path.exists():
+        return jsonify({'error': 'File not found'}), 404
+
+    logger.info(f"Downloading PDF: {pdf_path}")
+    return await send_file(
+        pdf_path,
+        as_attachment=True,
+        download_name=filename,
+        mimetype='application/pdf'
+    )
+
+
+@app.route('/metrics')
+async def metrics():
+    """Expose latency, payload and token metrics in Prometheus format."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/clear', methods=['POST'])
+async def clear_history():
+    """Clear chat history for a session."""
+    data = await request.get_json()
+    await aclear_chat_history(data.get('session_id', 'default'))
+    return jsonify({'status': 'success'})
+
+
+if __name__ == '__main__':
+    Path("output").mkdir(exist_ok=True)
+    app.run(host='0.0.0.0', port=8000)
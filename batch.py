@@ -0,0 +1,224 @@
+"""Headless batch mode: run the search -> read -> write pipeline for many topics.
+
+    python batch.py topics.txt --workers 4
+
+Each topic (one per line; blank lines, # comments and repeats that differ
+only in case or spacing are ignored) gets its own graph thread and is
+driven through PIPELINE one user turn at a time. Completed steps are
+appended to a progress file, so an interrupted run picks up where it
+stopped when started again with the same file. With CHECKPOINTER=sqlite a
+half-finished topic resumes at its next step; otherwise it is restarted.
+A topic whose write step produces no PDF is recorded as failed, and that
+step runs again next time. A summary report of timings and output PDFs is
+printed and written as JSON.
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from ai_researcher import get_graph, session_config, reset_session
+from chat_service import start_turn, chunk_events
+from telemetry import trace
+
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "2"))
+
+# User turns sent for every topic, in order
+PIPELINE = [
+    ("search", "Find recent arXiv papers about: {topic}"),
+    ("read", "Read the most relevant of these papers and summarise its key findings."),
+    ("write", "Write a short literature digest on {topic} based on the papers above, "
+              "and render it to PDF with render_latex_pdf."),
+]
+# A topic only counts as done once this step has produced a PDF
+PDF_STEP = "write"
+
+
+def topic_key(topic: str) -> str:
+    """Normalized form of a topic; topics with the same key are the same topic."""
+    return " ".join(topic.lower().split())
+
+
+def load_topics(path: str) -> list[str]:
+    """Read topics from a file, one per line, without duplicates (ignoring case and spacing)."""
+    topics = {}
+    with open(path) as f:
+        for line in f:
+            topic = line.strip()
+            if topic and not topic.startswith("#"):
+                topics.setdefault(topic_key(topic), topic)
+    return list(topics.values())
+
+
+def topic_session(topic: str) -> str:
+    """Stable session id for a topic, so reruns find the same graph thread."""
+    return "batch-" + hashlib.sha1(topic_key(topic).encode("utf-8")).hexdigest()[:12]
+
+
+class Progress:
+    """Append-only JSONL log of completed pipeline steps."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        """Completed steps per topic: {topic_key: {step: record}}; failed steps are left out."""
+        done = {}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by an interrupted run
+                    if not record.get("step"):
+                        continue
+                    steps = done.setdefault(topic_key(record["topic"]), {})
+                    if record.get("status") == "failed":
+                        steps.pop(record["step"], None)  # run it again
+                    else:
+                        steps[record["step"]] = record
+        except FileNotFoundError:
+            pass
+        return done
+
+    def record(self, **record):
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+def run_step(session_id: str, message: str) -> dict:
+    """Send one user turn and wait for the agent to finish it."""
+    chat_input, config = start_turn(session_id, message)
+    started = time.perf_counter()
+    tool_calls = []
+    response = ""
+    pdf = None
+    for chunk in get_graph().stream(chat_input, config, stream_mode="updates"):
+        for event in chunk_events(chunk):
+            if event["type"] == "tool_call":
+                tool_calls.append(event["name"])
+            elif event["type"] == "content":
+                response = event["content"]
+            elif event["type"] == "pdf":
+                pdf = event["path"]
+    return {"seconds": round(time.perf_counter() - started, 3), "tool_calls": tool_calls,
+            "response_chars": len(response), "pdf": pdf}
+
+
+def run_topic(topic: str, done_steps: dict, progress: Progress) -> dict:
+    """Drive one topic through the remaining PIPELINE steps."""
+    session_id = topic_session(topic)
+    pending = [(name, template) for name, template in PIPELINE if name not in done_steps]
+    if not pending:
+        return _topic_summary(topic, done_steps, resumed=True)
+
+    # Later steps build on the conversation, which only survives a restart
+    # with a persistent checkpointer; otherwise start the topic over.
+    if done_steps and not get_graph().get_state(session_config(session_id)).values.get("messages"):
+        print(f"[{topic}] previous conversation is gone, restarting topic")
+        done_steps = {}
+        pending = list(PIPELINE)
+    if not done_steps:
+        reset_session(session_id)
+
+    steps = dict(done_steps)
+    with trace(route="batch", topic=topic):
+        for name, template in pending:
+            print(f"[{topic}] {name}...")
+            result = run_step(session_id, template.format(topic=topic))
+            record = {"topic": topic, "step": name, "finished": datetime.now().isoformat(), **result}
+            if name == PDF_STEP and not result["pdf"]:
+                progress.record(**record, status="failed", error="no PDF was produced")
+                raise RuntimeError(f"{name} step produced no PDF")
+            progress.record(**record)
+            steps[name] = record
+            print(f"[{topic}] {name} done in {result['seconds']:.1f}s")
+    return _topic_summary(topic, steps, resumed=bool(done_steps))
+
+
+def _topic_summary(topic: str, steps: dict, resumed: bool) -> dict:
+    pdfs = [steps[name]["pdf"] for name, _ in PIPELINE if steps.get(name, {}).get("pdf")]
+    return {
+        "topic": topic,
+        "status": "done",
+        "resumed": resumed,
+        "steps": {name: steps[name]["seconds"] for name, _ in PIPELINE if name in steps},
+        "total_s": round(sum(step["seconds"] for step in steps.values()), 3),
+        "pdf": pdfs[-1] if pdfs else None,
+    }
+
+
+def run_batch(topics: list[str], workers: int, progress: Progress) -> dict:
+    """Run every topic on a bounded worker pool and summarise the results."""
+    done = progress.load()
+    started = time.perf_counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        futures = {executor.submit(run_topic, topic, done.get(topic_key(topic), {}), progress): topic
+                   for topic in topics}
+        for future in as_completed(futures):
+            topic = futures[future]
+            try:
+                results[topic] = future.result()
+            except Exception as e:
+                print(f"[{topic}] failed: {str(e)}")
+                results[topic] = {"topic": topic, "status": "failed", "error": str(e)}
+
+    summaries = [results[topic] for topic in topics]
+    return {
+        "finished": datetime.now().isoformat(),
+        "wall_s": round(time.perf_counter() - started, 3),
+        "workers": workers,
+        "done": sum(s["status"] == "done" for s in summaries),
+        "failed": sum(s["status"] == "failed" for s in summaries),
+        "pdfs": sum(bool(s.get("pdf")) for s in summaries),
+        "topics": summaries,
+    }
+
+
+def print_report(report: dict):
+    print(f"\n{'topic':<40}{'status':<10}{'total s':>9}  pdf")
+    for summary in report["topics"]:
+        status = summary["status"] + ("*" if summary.get("resumed") else "")
+        total = f"{summary['total_s']:.1f}" if "total_s" in summary else "-"
+        detail = summary.get("pdf") or summary.get("error") or "-"
+        print(f"{summary['topic'][:38]:<40}{status:<10}{total:>9}  {detail}")
+    print(f"\n{report['done']} done, {report['failed']} failed, {report['pdfs']} PDFs "
+          f"in {report['wall_s']:.1f}s with {report['workers']} workers (* = resumed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the research pipeline for a file of topics.")
+    parser.add_argument("topics_file")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--progress", help="progress log (default: <topics_file>.progress.jsonl)")
+    parser.add_argument("--report", help="summary report (default: <topics_file>.report.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore earlier progress")
+    args = parser.parse_args()
+
+    progress_path = args.progress or f"{args.topics_file}.progress.jsonl"
+    report_path = args.report or f"{args.topics_file}.report.json"
+    if args.restart and os.path.exists(progress_path):
+        os.remove(progress_path)
+
+    topics = load_topics(args.topics_file)
+    print(f"Running {len(topics)} topic(s) on {args.workers} worker(s)")
+    report = run_batch(topics, args.workers, Progress(progress_path))
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"Report written to {report_path}")
+    if report["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Offline regression checks for behaviour that broke before.
+
+    python benchmarks/checks.py                  # run every check
+    python benchmarks/checks.py compaction_one_turn
+
+Each check_* function raises AssertionError on failure. Like the benchmarks,
+the checks need no network access or API key. Exits with status 1 when a
+check fails.
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import offline
+
+
+def check_compaction_one_turn():
+    """A tool output from the current (only) turn is never compacted."""
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+    from compaction import compact_messages
+
+    messages = [
+        SystemMessage("system prompt", id="s"),
+        HumanMessage("Read this paper", id="h1"),
+        AIMessage("", id="a1", tool_calls=[{"name": "read_pdf", "args": {"url": "x"}, "id": "c1"}]),
+        ToolMessage("x" * 60000, tool_call_id="c1", id="t1"),
+    ]
+    assert compact_messages(messages, budget=1000, keep_recent_turns=2) == []
+    assert compact_messages(messages, budget=1000, keep_recent_turns=0) == []
+
+    # Once a new turn starts, the old output may go
+    messages.append(HumanMessage("Thanks, now summarise it", id="h2"))
+    replaced = compact_messages(messages, budget=1000, keep_recent_turns=1)
+    assert [m.id for m in replaced] == ["t1"], replaced
+
+
+def check_section_aliases_and_parts():
+    """Requested names go through the alias table, and long sections can be read part by part."""
+    from pdf_sections import select_sections
+
+    selected, more, missing = select_sections({"method": "m", "conclusion": "c"},
+                                              ["methods", "conclusions"], 3000)
+    assert [name for name, _ in selected] == ["method", "conclusion"] and not more and not missing
+
+    sections = {"abstract": "a " * 100, "method": "word " * 5000}
+    selected, more, _ = select_sections(sections, None, 3000)
+    assert [name for name, _ in selected] == ["abstract", "method (part 1 of 5)"], selected
+    assert more == ["method:2 (part 2 of 5)"], more
+    # The listed handle fetches the rest, and the parts add up to the whole section
+    text = selected[1][1]
+    while more:
+        selected, more, missing = select_sections(sections, [more[-1]], 3000)
+        assert not missing
+        text += " " + " ".join(part for _, part in selected)
+        more = [handle for handle in more if handle.startswith("method")]
+    assert text.split() == sections["method"].split()
+
+
+def check_pdf_cache_shared_between_processes():
+    """Cache instances sharing a directory (one per server process) keep each other's entries."""
+    from pdf_cache import PdfCache
+
+    first, second = (PdfCache("shared_pdfs", max_bytes=10 ** 6, max_age=60) for _ in range(2))
+    first.store("http://a/1.pdf", b"%PDF one", ["one"])
+    second.store("http://a/2.pdf", b"%PDF two", ["two"])
+    first.store("http://a/3.pdf", b"%PDF three", ["three"])
+    fresh = PdfCache("shared_pdfs", max_bytes=10 ** 6, max_age=60)
+    assert [fresh.load_pages(f"http://a/{i}.pdf") for i in (1, 2, 3)] == [["one"], ["two"], ["three"]]
+
+    # A blob deleted behind the index's back is written again instead of failing
+    for path in fresh.cache_dir.glob("*.pdf"):
+        path.unlink()
+    second.store("http://a/1.pdf", b"%PDF one", ["one"])
+    assert first.load_pdf("http://a/1.pdf") == b"%PDF one"
+
+    # Eviction by one process is seen by the others
+    small = PdfCache("shared_pdfs", max_bytes=1, max_age=60)
+    small.store("http://a/4.pdf", b"%PDF four", ["four"])
+    assert first.lookup("http://a/2.pdf") is None and first.load_pages("http://a/2.pdf") is None
+
+
+def check_lint_kernel_commands():
+    """Kernel commands are known, and undefined names never block compilation."""
+    from latex_lint import lint_latex
+
+    document = "\n".join([
+        r"\documentclass{article}",
+        r"\usepackage{amsmath}",
+        r"\begin{document}\sloppy",
+        r"x\textsuperscript{2} \ensuremath{\alpha} \hrulefill \dotfill \vskip 1em",
+        r"\end{document}",
+    ])
+    assert lint_latex(document) == [], lint_latex(document)
+
+    findings = lint_latex(document.replace(r"\sloppy", r"\madeupmacro \chapter{One}"))
+    assert {f.severity for f in findings} == {"warning"}, findings
+    # \chapter is only defined by classes that have chapters
+    assert lint_latex(document.replace("article", "report").replace(r"\sloppy", r"\chapter{One}")) == []
+
+    findings = lint_latex(document.replace(r"\end{document}", r"\begin{center}{\end{document}"))
+    assert [f.severity for f in findings] == ["error"] * len(findings) and len(findings) == 3, findings
+
+
+def check_render_cache_transient_errors():
+    """Only tectonic's download and I/O errors count as transient, and cached errors expire."""
+    from latex_diagnostics import is_transient_failure
+    from render_cache import RenderCache
+
+    missing = "error: paper.tex:3: LaTeX Error: File `nosuchpkg.sty' not found.\n"
+    assert not is_transient_failure(missing)
+    assert is_transient_failure(missing + "error: failed to download \"tikz.sty\" from the bundle\n"
+                                          "caused by: error sending request: connection refused\n")
+    assert not is_transient_failure("error: paper.tex:38: Undefined control sequence\n"
+                                    "l.38 We add residual connections to the \\foo\n"
+                                    "error: halted on potentially-recoverable error as specified\n")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = RenderCache(cache_dir, max_bytes=10 ** 6, error_ttl=60)
+        cache.store_error("k", "Undefined control sequence")
+        assert cache.lookup("k") == {"error": "Undefined control sequence"}
+        cache._index["k"]["created"] -= 61
+        assert cache.lookup("k") is None
+
+
+def check_render_warmup_within_pool():
+    """The tectonic warm-up counts against RENDER_WORKERS like any other compile."""
+    import time
+    import threading
+    from render_service import RenderService, RenderResult
+
+    class CountingRenderService(RenderService):
+        active = peak = 0
+        lock = threading.Lock()
+
+        def _compile(self, latex_content, keep=True):
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.2)
+            with self.lock:
+                self.active -= 1
+            return RenderResult(0, "", "", None, None)
+
+    service = CountingRenderService(output_dir="render_output", workers=2, cache_dir="render_cache")
+    for future in [service.submit("x") for _ in range(4)]:
+        future.result()
+    assert service.peak == 2, service.peak
+
+
+def check_tool_timeout_excludes_queue_wait():
+    """Sync and async runs time calls from when they start and free the slots of timed-out calls."""
+    import time
+    import asyncio
+    import threading
+    from langchain_core.messages import AIMessage
+    from langchain_core.tools import tool
+    from tool_runner import make_tool_node, TOOL_WORKERS
+
+    release = threading.Event()
+
+    @tool
+    def slow_check_tool(n: int) -> str:
+        """Sleep briefly."""
+        time.sleep(0.3)
+        return str(n)
+
+    @tool
+    def hung_check_tool() -> str:
+        """Block until released."""
+        release.wait(10)
+        return "late"
+
+    node = make_tool_node([slow_check_tool, hung_check_tool],
+                          timeouts={"slow_check_tool": 0.5, "hung_check_tool": 0.1})
+    # Two waves: the second starts after ~0.3s and would overrun a clock started at submission
+    calls = [{"name": "slow_check_tool", "args": {"n": i}, "id": f"c{i}"} for i in range(2 * TOOL_WORKERS)]
+    hung = [{"name": "hung_check_tool", "args": {}, "id": "h"}]
+    runs = {"sync": lambda state: node.invoke(state), "async": lambda state: asyncio.run(node.ainvoke(state))}
+    try:
+        for mode, run in runs.items():
+            messages = run({"messages": [AIMessage("", tool_calls=calls)]})["messages"]
+            assert [m.content for m in messages] == [str(i) for i in range(len(calls))], (mode, messages)
+
+            # The hung call times out but keeps its thread; a full wave after it must not wait for it
+            messages = run({"messages": [AIMessage("", tool_calls=hung)]})["messages"]
+            assert messages[0].status == "error" and "timed out" in messages[0].content, (mode, messages)
+            started = time.monotonic()
+            messages = run({"messages": [AIMessage("", tool_calls=calls[:TOOL_WORKERS])]})["messages"]
+            assert all(m.status != "error" for m in messages), (mode, messages)
+            assert time.monotonic() - started < 1.0, mode
+    finally:
+        release.set()
+
+
+def check_graph_built_once():
+    """Concurrent first callers share one checkpointer and graph."""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    import ai_researcher
+
+    # Building the model client needs a key, but never calls the API
+    os.environ.setdefault("GROQ_API_KEY", "offline-check")
+    for getter in (ai_researcher.get_graph, ai_researcher.get_checkpointer):
+        getter.cache_clear()
+    barrier = threading.Barrier(8)
+
+    def first_call(_):
+        barrier.wait()
+        return ai_researcher.get_graph(), ai_researcher.get_checkpointer()
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(first_call, range(8)))
+    assert len({id(graph) for graph, _ in results}) == 1
+    assert len({id(saver) for _, saver in results}) == 1
+    assert results[0][0].checkpointer is results[0][1]
+
+
+def check_thread_eviction_spares_running_turns():
+    """Threads mid-turn are not evicted, and async callers delete without the sync API."""
+    import asyncio
+    from langgraph.checkpoint.memory import MemorySaver
+    from ai_researcher import build_graph, INITIAL_PROMPT, RECURSION_LIMIT
+    from checkpoints import ThreadTracker
+
+    class RecordingSaver(MemorySaver):
+        deleted = []
+
+        def delete_thread(self, thread_id):
+            self.deleted.append(("sync", thread_id))
+            super().delete_thread(thread_id)
+
+        async def adelete_thread(self, thread_id):
+            self.deleted.append(("async", thread_id))
+            super().delete_thread(thread_id)
+
+    saver = RecordingSaver()
+    tracker = ThreadTracker(saver, ttl=3600, max_threads=1)
+    graph = build_graph(model=offline.ScriptedChatModel(script=offline.DEFAULT_SCRIPT), checkpointer=saver)
+    chat_input = {"messages": [{"role": "system", "content": INITIAL_PROMPT},
+                               {"role": "user", "content": "Find papers on diffusion models"}]}
+    config = {"configurable": {"thread_id": "a"}, "recursion_limit": RECURSION_LIMIT,
+              "callbacks": [tracker.turn_handler("a")]}
+
+    tracker.touch("a")
+    for step, _ in enumerate(graph.stream(chat_input, config, stream_mode="updates")):
+        # Other sessions take turns while "a" is streaming; each evicts the one before
+        tracker.touch(f"b{step}")
+        tracker.end_turn(f"b{step}")
+    assert ("sync", "a") not in saver.deleted and ("sync", "b0") in saver.deleted, saver.deleted
+    assert graph.get_state(config).values["messages"]
+
+    # The turn has ended, so "a" is evictable now; async callers use adelete_thread
+    synced = len(saver.deleted)
+    asyncio.run(tracker.atouch("c"))
+    assert ("async", "a") in saver.deleted[synced:], saver.deleted
+    assert all(mode == "async" for mode, _ in saver.deleted[synced:]), saver.deleted
+
+
+def check_batch_topics_and_missing_pdf():
+    """Topics differing only in case are one topic; a write step without a PDF fails."""
+    import batch
+
+    with open("topics.txt", "w") as f:
+        f.write("Diffusion Models\n# comment\ndiffusion  models\nGraph neural networks\n")
+    assert batch.load_topics("topics.txt") == ["Diffusion Models", "Graph neural networks"]
+    assert batch.topic_session("Diffusion Models") == batch.topic_session("diffusion  models")
+
+    run_step, reset_session = batch.run_step, batch.reset_session
+    batch.run_step = lambda session_id, message: {"seconds": 0.0, "tool_calls": [],
+                                                  "response_chars": 1, "pdf": None}
+    batch.reset_session = lambda session_id: None
+    try:
+        progress = batch.Progress("topics.progress.jsonl")
+        report = batch.run_batch(["Diffusion Models"], 1, progress)
+    finally:
+        batch.run_step, batch.reset_session = run_step, reset_session
+    assert report["failed"] == 1 and report["done"] == 0, report
+    assert set(progress.load()[batch.topic_key("Diffusion Models")]) == {"search", "read"}
+
+
+CHECKS = {name[len("check_"):]: func for name, func in globals().items() if name.startswith("check_")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("checks", nargs="*", metavar="check", help=f"any of: {', '.join(CHECKS)}")
+    args = parser.parse_args()
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check(s): {', '.join(unknown)}")
+    args.checks = args.checks or list(CHECKS)
+
+    workdir = tempfile.mkdtemp(prefix="checks_")
+    offline.isolate_state(workdir)
+    offline.install_fixture_transport()
+    failed = []
+    try:
+        for name in args.checks:
+            try:
+                CHECKS[name]()
+            except Exception:
+                failed.append(name)
+                print(f"FAIL {name}")
+                traceback.print_exc()
+            else:
+                print(f"ok   {name}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(f"\n{len(args.checks) - len(failed)} passed, {len(failed)} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
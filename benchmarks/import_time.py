@@ -0,0 +1,83 @@
+"""Measure cold-start cost of the agent modules.
+
+Each measurement runs in a fresh interpreter so nothing is already imported.
+
+    python benchmarks/import_time.py [--runs 5] [--graph] [--modules ai_researcher app]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+_GRAPH_SNIPPET = """
+import time
+import ai_researcher
+start = time.perf_counter()
+ai_researcher.get_graph()
+print(time.perf_counter() - start)
+"""
+
+
+def _time_snippet(snippet: str) -> float:
+    env = dict(os.environ)
+    # Building the model client needs a key, but never calls the API
+    env.setdefault("GROQ_API_KEY", "benchmark")
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _summary(samples: list[float]) -> dict:
+    return {
+        "min_s": round(min(samples), 4),
+        "median_s": round(statistics.median(samples), 4),
+        "max_s": round(max(samples), 4),
+    }
+
+
+def slowest_imports(module: str, top: int = 10) -> list[tuple[str, int]]:
+    """Top cumulative import times (microseconds) from `python -X importtime`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(cumulative)))
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modules", nargs="+", default=["ai_researcher", "chat_service", "app"])
+    parser.add_argument("--graph", action="store_true", help="also time the first get_graph() call")
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest imports per module")
+    args = parser.parse_args()
+
+    report = {}
+    for module in args.modules:
+        samples = [_time_snippet(_IMPORT_SNIPPET.format(module=module)) for _ in range(args.runs)]
+        report[f"import {module}"] = _summary(samples)
+        if args.top:
+            report[f"import {module}"]["slowest"] = slowest_imports(module, args.top)
+    if args.graph:
+        samples = [_time_snippet(_GRAPH_SNIPPET) for _ in range(args.runs)]
+        report["get_graph()"] = _summary(samples)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
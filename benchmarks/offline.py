@@ -0,0 +1,182 @@
+"""Offline stand-ins for the network and the LLM, used by the benchmarks.
+
+FixtureAdapter serves recorded arXiv feeds and sample PDFs through the shared
+http_client session, so the real request, streaming and caching code runs
+unchanged. ScriptedChatModel replays a fixed sequence of tool calls.
+"""
+import io
+import os
+import hashlib
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from requests.adapters import BaseAdapter
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+ROOT = Path(__file__).absolute().parent.parent
+FIXTURES_DIR = ROOT / "benchmarks" / "fixtures"
+ARXIV_FIXTURES = FIXTURES_DIR / "arxiv"
+PDF_FIXTURES = FIXTURES_DIR / "pdfs"
+# Papers the agent wrote earlier double as LaTeX and PDF samples
+OUTPUT_DIR = ROOT / "output"
+
+
+def feed_files() -> list[Path]:
+    return sorted(ARXIV_FIXTURES.glob("*.xml"))
+
+
+def sample_pdfs() -> list[Path]:
+    return sorted(PDF_FIXTURES.glob("*.pdf")) + sorted(OUTPUT_DIR.glob("*.pdf"))
+
+
+def sample_latex() -> list[Path]:
+    return sorted(OUTPUT_DIR.glob("*.tex"))
+
+
+def long_pdf(min_pages: int) -> bytes:
+    """Concatenate the sample PDFs until the document has at least `min_pages` pages."""
+    import PyPDF2
+
+    writer = PyPDF2.PdfWriter()
+    sources = [PyPDF2.PdfReader(str(path)) for path in sample_pdfs()]
+    while len(writer.pages) < min_pages:
+        for reader in sources:
+            for page in reader.pages:
+                writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def truncate_feed(xml: str, max_results: int) -> str:
+    """Keep the first `max_results` entries of an Atom feed, as the API would."""
+    head, *entries = xml.split("<entry>")
+    if len(entries) <= max_results:
+        return xml
+    kept = entries[:max_results]
+    kept[-1] = kept[-1][:kept[-1].index("</entry>") + len("</entry>")]
+    return head + "<entry>".join([""] + kept) + "\n</feed>\n"
+
+
+class FixtureAdapter(BaseAdapter):
+    """requests transport adapter that answers from local fixtures.
+
+    arXiv API queries get the feed named after the query (falling back to
+    the first feed), trimmed to max_results. Any /pdf/ URL gets one of the
+    sample PDFs, picked deterministically from the URL.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.feeds = {path.stem.lower(): path.read_text() for path in feed_files()}
+        self.pdfs = [path.read_bytes() for path in sample_pdfs()]
+        self.requests = 0
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        self.requests += 1
+        url = urlparse(request.url)
+        if url.path.endswith("/api/query"):
+            params = parse_qs(url.query)
+            query = params.get("search_query", ["all:"])[0].split(":", 1)[-1].replace(" ", "+").lower()
+            xml = self.feeds.get(query) or next(iter(self.feeds.values()))
+            max_results = int(params.get("max_results", ["10"])[0])
+            return self._response(request, 200, truncate_feed(xml, max_results).encode(),
+                                  "application/atom+xml")
+        if "/pdf/" in url.path and self.pdfs:
+            digest = int(hashlib.sha256(request.url.encode()).hexdigest(), 16)
+            return self._response(request, 200, self.pdfs[digest % len(self.pdfs)],
+                                  "application/pdf")
+        return self._response(request, 404, b"not found", "text/plain")
+
+    @staticmethod
+    def _response(request, status: int, body: bytes, content_type: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.reason = "OK" if status == 200 else "Not Found"
+        response.headers["Content-Type"] = content_type
+        response.headers["Content-Length"] = str(len(body))
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        pass
+
+
+def install_fixture_transport() -> FixtureAdapter:
+    """Route every request made through http_client to the local fixtures."""
+    import http_client
+
+    adapter = FixtureAdapter()
+    session = http_client.get_session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return adapter
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that replays a fixed list of replies for every user turn.
+
+    `script` holds one entry per model call after the latest user message:
+    either a string (final answer) or a list of (tool name, args) pairs.
+    Arg values may reference the previous tool output with "{pdf}" (first
+    PDF link in it), so a search can be followed by reading a result.
+    """
+
+    script: list
+    prompt_chars_per_token: int = 4
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        last_user = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        step = sum(isinstance(m, AIMessage) for m in messages[last_user:])
+        reply = self.script[min(step, len(self.script) - 1)]
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // self.prompt_chars_per_token
+
+        if isinstance(reply, str):
+            message = AIMessage(content=reply)
+        else:
+            context = {"pdf": _first_pdf_link(str(messages[-1].content))}
+            message = AIMessage(content="", tool_calls=[
+                {"name": name, "id": f"call_{step}_{i}",
+                 "args": {k: v.format(**context) if isinstance(v, str) else v for k, v in args.items()}}
+                for i, (name, args) in enumerate(reply)
+            ])
+        completion_tokens = max(1, len(str(message.content) or str(message.tool_calls)) // self.prompt_chars_per_token)
+        message.usage_metadata = {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                                  "total_tokens": prompt_tokens + completion_tokens}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def _first_pdf_link(text: str) -> str:
+    start = text.find("http://arxiv.org/pdf/")
+    if start == -1:
+        return ""
+    end = start
+    while end < len(text) and text[end] not in "'\" ,}\n":
+        end += 1
+    return text[start:end]
+
+
+DEFAULT_SCRIPT = [
+    [("arxiv_search", {"topic": "large language models"})],
+    [("read_pdf_sections", {"url": "{pdf}"})],
+    "Here is a summary of the paper and three follow-up research ideas.",
+]
+
+
+def isolate_state(workdir: str):
+    """Keep caches, indexes and generated files of a benchmark run out of the repo."""
+    os.chdir(workdir)
+    os.environ.setdefault("CHECKPOINTER", "memory")
@@ -0,0 +1,50 @@
+"""Record arXiv responses for the offline benchmarks (needs network access).
+
+    python benchmarks/record_fixtures.py "large language models" "diffusion models" --pdfs 2
+
+Feeds are saved as benchmarks/fixtures/arxiv/<cleaned query>.xml, which is
+the name FixtureAdapter looks up; PDFs go to benchmarks/fixtures/pdfs/.
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client
+from arxiv_tool import clean_query, parse_arxiv_xml
+from benchmarks import offline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("topics", nargs="+")
+    parser.add_argument("--max-results", type=int, default=100)
+    parser.add_argument("--pdfs", type=int, default=0, help="also download the first N PDFs of each feed")
+    args = parser.parse_args()
+
+    offline.ARXIV_FIXTURES.mkdir(parents=True, exist_ok=True)
+    offline.PDF_FIXTURES.mkdir(parents=True, exist_ok=True)
+    for topic in args.topics:
+        query = clean_query(topic)
+        response = http_client.get(
+            "http://export.arxiv.org/api/query"
+            f"?search_query=all:{query}&max_results={args.max_results}"
+            "&sortBy=submittedDate&sortOrder=descending"
+        )
+        response.raise_for_status()
+        feed_path = offline.ARXIV_FIXTURES / f"{query.lower()}.xml"
+        feed_path.write_bytes(response.content)
+        entries = parse_arxiv_xml(response.text)["entries"]
+        print(f"Recorded {len(entries)} entries to {feed_path}")
+
+        for entry in entries[:args.pdfs]:
+            pdf = http_client.get(entry["pdf"])
+            pdf.raise_for_status()
+            pdf_path = offline.PDF_FIXTURES / f"{entry['id']}.pdf"
+            pdf_path.write_bytes(pdf.content)
+            print(f"Recorded {pdf_path}")
+
+
+if __name__ == "__main__":
+    main()
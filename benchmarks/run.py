@@ -0,0 +1,309 @@
+"""Offline benchmark suite for the agent's hot paths.
+
+Runs without network access: arXiv and PDF downloads are served from
+benchmarks/fixtures (plus the PDFs in output/), and a full graph turn is
+driven by a scripted chat model. Each stage reports per-iteration latency,
+throughput and peak Python memory, and can be compared to a stored baseline.
+
+    python benchmarks/run.py                      # run and compare to baseline.json
+    python benchmarks/run.py --stages parse_arxiv_xml sanitize_latex
+    python benchmarks/run.py --save-baseline      # record the current numbers
+
+Exits with status 1 when a stage's median latency regresses past --threshold,
+and with status 2 when there is no baseline to compare to.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import offline
+
+BASELINE_FILE = offline.ROOT / "benchmarks" / "baseline.json"
+# A stage is reported as a regression when its median latency grows by more than this
+DEFAULT_THRESHOLD = 0.20
+
+
+class SkipStage(Exception):
+    """Raised by a stage's setup when it cannot run on this machine."""
+
+
+# Each stage setup returns a callable running one iteration; the callable
+# returns how many items it processed (feeds, documents, turns, ...).
+
+def stage_parse_arxiv_xml():
+    from arxiv_tool import parse_arxiv_xml
+
+    feeds = [path.read_text() for path in offline.feed_files()]
+
+    def run():
+        return sum(len(parse_arxiv_xml(feed)["entries"]) for feed in feeds)
+    return run
+
+
+def stage_search_arxiv_papers():
+    from arxiv_tool import search_arxiv_papers
+    import arxiv_tool
+
+    topics = [path.stem.replace("+", " ") for path in offline.feed_files()]
+
+    def run():
+        # Every iteration goes through the transport instead of the result cache
+        arxiv_tool._search_cache.clear()
+        for topic in topics:
+            search_arxiv_papers(topic, max_results=5)
+        return len(topics)
+    return run
+
+
+def stage_rank_papers():
+    from arxiv_tool import parse_arxiv_xml
+    from relevance import rank_papers
+
+    pools = [(path.stem.replace("+", " "), parse_arxiv_xml(path.read_text())["entries"])
+             for path in offline.feed_files()]
+
+    def run():
+        for topic, entries in pools:
+            rank_papers(topic, entries, 5)
+        return len(pools)
+    return run
+
+
+def stage_collapse_duplicates():
+    from arxiv_tool import parse_arxiv_xml
+    from near_duplicates import DuplicateTracker
+
+    pools = [parse_arxiv_xml(path.read_text())["entries"] for path in offline.feed_files()]
+
+    def run():
+        # A fresh tracker, so every abstract is signed again
+        tracker = DuplicateTracker()
+        for entries in pools:
+            tracker.collapse(entries)
+        return sum(len(entries) for entries in pools)
+    return run
+
+
+def stage_extract_pages():
+    from read_pdf import extract_pages, PARALLEL_MIN_PAGES
+
+    if not offline.sample_pdfs():
+        raise SkipStage("no sample PDFs")
+    documents = [path.read_bytes() for path in offline.sample_pdfs()]
+    # One long document so the parallel extraction path is exercised too
+    documents.append(offline.long_pdf(2 * PARALLEL_MIN_PAGES))
+
+    def run():
+        return sum(len(extract_pages(content)) for content in documents)
+    return run
+
+
+def stage_read_pdf():
+    from read_pdf import read_pdf
+    from pdf_cache import pdf_cache
+
+    if not offline.sample_pdfs():
+        raise SkipStage("no sample PDFs")
+    urls = [f"http://arxiv.org/pdf/2609.{10000 + i}v1" for i in range(len(offline.sample_pdfs()))]
+
+    def run():
+        # Cold path: download (from fixtures), extract, cache and index
+        pdf_cache.clear()
+        for url in urls:
+            # force: several fixture URLs serve the same PDF, which would be skipped as duplicates
+            read_pdf.invoke({"url": url, "force": True})
+        return len(urls)
+    return run
+
+
+def stage_sanitize_latex():
+    from write_pdf import sanitize_latex
+
+    documents = [path.read_text() for path in offline.sample_latex()]
+    if not documents:
+        raise SkipStage("no LaTeX files in output/")
+
+    def run():
+        for document in documents:
+            sanitize_latex(document)
+        return len(documents)
+    return run
+
+
+def stage_render_latex_pdf():
+    from write_pdf import render_latex_pdf
+    from render_cache import render_cache
+
+    if shutil.which("tectonic") is None:
+        raise SkipStage("tectonic is not installed")
+    documents = [path.read_text() for path in offline.sample_latex()]
+    if not documents:
+        raise SkipStage("no LaTeX files in output/")
+
+    def run():
+        # Forget earlier renders so every document is linted and compiled again
+        render_cache._index = {}
+        for document in documents:
+            render_latex_pdf.invoke({"latex_content": document})
+        return len(documents)
+    return run
+
+
+def stage_graph_turn():
+    from langgraph.checkpoint.memory import MemorySaver
+    from ai_researcher import build_graph, INITIAL_PROMPT, RECURSION_LIMIT
+    from pdf_cache import pdf_cache
+    import arxiv_tool
+
+    graph = build_graph(model=offline.ScriptedChatModel(script=offline.DEFAULT_SCRIPT),
+                        checkpointer=MemorySaver())
+    turns = iter(range(10 ** 9))
+
+    def run():
+        arxiv_tool._search_cache.clear()
+        pdf_cache.clear()
+        turn_config = {"configurable": {"thread_id": f"bench-{next(turns)}"},
+                       "recursion_limit": RECURSION_LIMIT}
+        chat_input = {"messages": [{"role": "system", "content": INITIAL_PROMPT},
+                                   {"role": "user", "content": "Find papers on large language models"}]}
+        for _ in graph.stream(chat_input, turn_config, stream_mode="updates"):
+            pass
+        return 1
+    return run
+
+
+STAGES = {
+    "parse_arxiv_xml": stage_parse_arxiv_xml,
+    "search_arxiv_papers": stage_search_arxiv_papers,
+    "rank_papers": stage_rank_papers,
+    "collapse_duplicates": stage_collapse_duplicates,
+    "extract_pages": stage_extract_pages,
+    "read_pdf": stage_read_pdf,
+    "sanitize_latex": stage_sanitize_latex,
+    "render_latex_pdf": stage_render_latex_pdf,
+    "graph_turn": stage_graph_turn,
+}
+
+
+def measure(run, iterations: int, warmup: int = 1) -> dict:
+    """Time `run` and record its peak traced memory in a separate pass."""
+    for _ in range(warmup):
+        run()
+    latencies = []
+    items = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        items += run()
+        latencies.append(time.perf_counter() - start)
+
+    # tracemalloc slows allocation-heavy code down, so it is kept out of the timings
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "items_per_iteration": items // iterations,
+        "median_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_per_s": round(items / sum(latencies), 2),
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> dict:
+    """Median latency ratio (current / baseline) per stage present in both."""
+    comparison = {}
+    for name, result in results.items():
+        before = baseline.get(name)
+        if "median_ms" not in result or not before or "median_ms" not in before:
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        comparison[name] = {
+            "baseline_median_ms": before["median_ms"],
+            "ratio": round(ratio, 3),
+            "status": "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else "same",
+        }
+    return comparison
+
+
+def print_table(results: dict, comparison: dict):
+    print(f"{'stage':<22}{'median ms':>11}{'p95 ms':>10}{'items/s':>10}{'peak KB':>10}  vs baseline")
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<22}  skipped: {result['skipped']}")
+            continue
+        delta = comparison.get(name)
+        note = f"x{delta['ratio']:.2f} ({delta['status']})" if delta else "-"
+        print(f"{name:<22}{result['median_ms']:>11.2f}{result['p95_ms']:>10.2f}"
+              f"{result['throughput_per_s']:>10.1f}{result['peak_mem_kb']:>10.0f}  {note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--baseline", default=str(BASELINE_FILE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative median slowdown reported as a regression")
+    parser.add_argument("--json", help="also write the full report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the code's own progress output")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["stages"]
+    elif not args.save_baseline:
+        # Without a baseline nothing could ever be flagged as a regression
+        parser.exit(2, f"No baseline at {args.baseline}; record one with --save-baseline\n")
+
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    offline.isolate_state(workdir)
+    offline.install_fixture_transport()
+
+    results = {}
+    sink = sys.stdout if args.verbose else open(os.devnull, "w")
+    try:
+        for name in args.stages:
+            print(f"Running {name}...", file=sys.stderr)
+            with redirect_stdout(sink):
+                try:
+                    results[name] = measure(STAGES[name](), args.iterations)
+                except SkipStage as e:
+                    results[name] = {"skipped": str(e)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    comparison = compare(results, baseline, args.threshold)
+    print_table(results, comparison)
+
+    report = {"python": sys.version.split()[0], "stages": results, "comparison": comparison}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"python": report["python"], "stages": {**baseline, **results}}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif any(c["status"] == "slower" for c in comparison.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import json
+import os
+from langchain_core.messages import AIMessage, AIMessageChunk
+from ai_researcher import (
+    INITIAL_PROMPT, get_graph, session_config, asession_config, reset_session, areset_session,
+)
+
+
+def _turn_input(state, user_message):
+    # The conversation lives in the session's checkpointed graph thread, so only
+    # the new message is sent; the system prompt starts a fresh thread.
+    messages = [] if state.values.get("messages") else [
+        {"role": "system", "content": INITIAL_PROMPT}
+    ]
+    messages.append({"role": "user", "content": user_message})
+    return {"messages": messages}
+
+
+def start_turn(session_id, user_message, use_llm_cache=True):
+    """Prepare the agent input and graph config for a new user message."""
+    config = session_config(session_id, use_llm_cache)
+    return _turn_input(get_graph().get_state(config), user_message), config
+
+
+async def astart_turn(session_id, user_message, use_llm_cache=True):
+    """Async version of start_turn."""
+    config = await asession_config(session_id, use_llm_cache)
+    return _turn_input(await get_graph().aget_state(config), user_message), config
+
+
+def clear_chat_history(session_id):
+    """Clear chat history for a session."""
+    reset_session(session_id)
+
+
+async def aclear_chat_history(session_id):
+    """Async version of clear_chat_history."""
+    await areset_session(session_id)
+
+
+def message_text(message):
+    """Return the plain text of an assistant message's content."""
+    if isinstance(message.content, str):
+        return message.content
+    elif isinstance(message.content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in message.content
+        )
+    return str(message.content)
+
+
+def chunk_events(chunk):
+    """Turn one `stream_mode="updates"` chunk into UI events.
+
+    Yields dicts of the form {'type': 'tool_call', 'name': ...},
+    {'type': 'content', 'content': ...} and {'type': 'pdf', 'path': ...}.
+    """
+    # Check for agent node updates
+    if "agent" in chunk:
+        for message in chunk["agent"].get("messages", []):
+            # Handle tool calls
+            if hasattr(message, "tool_calls") and message.tool_calls:
+                for tool_call in message.tool_calls:
+                    yield {'type': 'tool_call', 'name': tool_call['name']}
+
+            # Handle assistant response
+            if isinstance(message, AIMessage) and message.content:
+                text_content = message_text(message)
+                if text_content.strip():
+                    yield {'type': 'content', 'content': text_content}
+
+    # Check for tools node updates
+    if "tools" in chunk:
+        for msg in chunk["tools"].get("messages", []):
+            # Check if a PDF was generated
+            if hasattr(msg, "content") and msg.content:
+                content = msg.content
+                if isinstance(content, str) and content.endswith('.pdf'):
+                    yield {'type': 'pdf', 'path': content}
+
+
+# Pass as stream_mode to get both node updates and LLM tokens
+STREAM_MODES = ["updates", "messages"]
+
+
+def _mode_events(mode, chunk):
+    if mode == "messages":
+        # Token chunks from the agent's LLM call
+        message, metadata = chunk
+        if (metadata.get("langgraph_node") == "agent"
+                and isinstance(message, AIMessageChunk) and message.content):
+            text = message_text(message)
+            if text:
+                yield {'type': 'delta', 'content': text}
+    elif mode == "updates":
+        yield from chunk_events(chunk)
+
+
+def stream_events(stream):
+    """Turn a `stream_mode=STREAM_MODES` graph stream into UI events.
+
+    Adds {'type': 'delta', 'content': ...} token events ahead of the
+    chunk_events ones; the 'content' event still carries the full message.
+    """
+    for mode, chunk in stream:
+        yield from _mode_events(mode, chunk)
+
+
+async def astream_events(stream):
+    """Async version of stream_events for graph.astream."""
+    async for mode, chunk in stream:
+        for event in _mode_events(mode, chunk):
+            yield event
+
+
+def sse(event):
+    """Format an event as a Server-Sent Events data line."""
+    if event.get('type') == 'pdf':
+        event = {'type': 'pdf', 'filename': os.path.basename(event['path'])}
+    return f"data: {json.dumps(event)}\n\n"
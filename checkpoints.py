@@ -0,0 +1,178 @@
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.checkpoint.memory import MemorySaver
+
+
+# "memory" keeps conversations in process memory, "sqlite" persists them to CHECKPOINT_DB
+CHECKPOINTER = os.getenv("CHECKPOINTER", "memory")
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "cache/checkpoints.db")
+# Conversations idle for longer than this are deleted
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(24 * 60 * 60)))
+# Upper bound on stored conversations; the least recently active are deleted first
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "500"))
+# A turn that never reports its end stops protecting its thread from eviction after this long
+MAX_TURN_SECONDS = float(os.getenv("MAX_TURN_SECONDS", str(30 * 60)))
+
+
+def create_checkpointer(kind: str = CHECKPOINTER, db_path: str = CHECKPOINT_DB):
+    """Create the LangGraph checkpointer selected by `kind`."""
+    if kind == "memory":
+        return MemorySaver()
+    if kind == "sqlite":
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        class ThreadedSqliteSaver(SqliteSaver):
+            """SqliteSaver whose async methods run the sync ones on a thread,
+            so the same checkpointer serves graph.stream() and graph.astream()."""
+
+            async def aget_tuple(self, config):
+                return await asyncio.to_thread(self.get_tuple, config)
+
+            async def alist(self, config, *, filter=None, before=None, limit=None):
+                items = await asyncio.to_thread(
+                    lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+                )
+                for item in items:
+                    yield item
+
+            async def aput(self, config, checkpoint, metadata, new_versions):
+                return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+            async def aput_writes(self, config, writes, task_id, task_path=""):
+                return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+            async def adelete_thread(self, thread_id):
+                return await asyncio.to_thread(self.delete_thread, thread_id)
+
+        Path(db_path).absolute().parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        return ThreadedSqliteSaver(conn)
+    raise ValueError(f"Unknown checkpointer: {kind}. Use 'memory' or 'sqlite'.")
+
+
+class _TurnEndHandler(BaseCallbackHandler):
+    """Tells the tracker when the graph run of a turn ends, however it ends."""
+
+    run_inline = True
+
+    def __init__(self, tracker, thread_id: str):
+        self.tracker = tracker
+        self.thread_id = thread_id
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self.tracker.end_turn(self.thread_id)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self.tracker.end_turn(self.thread_id)
+
+
+class ThreadTracker:
+    """Track when each graph thread was last active and evict stale ones.
+
+    Threads idle for more than `ttl` seconds, and the least recently active
+    threads beyond `max_threads`, are deleted from the checkpointer; threads
+    with a turn in progress are never evicted. With a `db_path` the activity
+    table is persisted next to the checkpoints so eviction survives restarts.
+    Async callers use atouch/aforget so deletions do not block the event loop.
+    """
+
+    def __init__(self, checkpointer, ttl: float, max_threads: int, db_path: str | None = None):
+        self.checkpointer = checkpointer
+        self.ttl = ttl
+        self.max_threads = max_threads
+        self._lock = threading.Lock()
+        # thread id -> last activity, least recently active first
+        self._last_used = OrderedDict()
+        # thread id -> start of its turn in progress
+        self._turns = {}
+        self._conn = None
+        if db_path:
+            Path(db_path).absolute().parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity "
+                "(thread_id TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+            )
+            self._last_used = OrderedDict(self._conn.execute(
+                "SELECT thread_id, last_used FROM thread_activity ORDER BY last_used"
+            ).fetchall())
+
+    def _start_turn(self, thread_id: str) -> list[str]:
+        """Mark a thread as active with a turn in progress; return the threads to evict."""
+        with self._lock:
+            now = time.time()
+            self._last_used[thread_id] = now
+            self._last_used.move_to_end(thread_id)
+            self._turns[thread_id] = now
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO thread_activity VALUES (?, ?)", (thread_id, now)
+                    )
+            # Oldest first; stop at the first thread that is neither excess nor idle
+            excess = len(self._last_used) - self.max_threads
+            stale = []
+            for other, last_used in self._last_used.items():
+                if excess <= 0 and now - last_used <= self.ttl:
+                    break
+                if other == thread_id or now - self._turns.get(other, 0) < MAX_TURN_SECONDS:
+                    continue
+                stale.append(other)
+                excess -= 1
+            for stale_id in stale:
+                self._untrack(stale_id)
+            return stale
+
+    def touch(self, thread_id: str):
+        """Mark a thread as active now, at the start of a turn, and evict stale threads."""
+        for stale_id in self._start_turn(thread_id):
+            self._delete(stale_id)
+
+    async def atouch(self, thread_id: str):
+        """Async version of touch."""
+        for stale_id in self._start_turn(thread_id):
+            await self._adelete(stale_id)
+
+    def end_turn(self, thread_id: str):
+        """Mark a thread's turn as finished, so it may be evicted again."""
+        with self._lock:
+            self._turns.pop(thread_id, None)
+
+    def turn_handler(self, thread_id: str) -> BaseCallbackHandler:
+        """Callback handler that ends the thread's turn when its graph run ends."""
+        return _TurnEndHandler(self, thread_id)
+
+    def forget(self, thread_id: str):
+        """Delete a thread's checkpoints immediately."""
+        with self._lock:
+            self._untrack(thread_id)
+        self._delete(thread_id)
+
+    async def aforget(self, thread_id: str):
+        """Async version of forget."""
+        with self._lock:
+            self._untrack(thread_id)
+        await self._adelete(thread_id)
+
+    def _untrack(self, thread_id: str):
+        self._last_used.pop(thread_id, None)
+        self._turns.pop(thread_id, None)
+        if self._conn is not None:
+            with self._conn:
+                self._conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+
+    def _delete(self, thread_id: str):
+        print(f"Deleting conversation thread {thread_id}")
+        self.checkpointer.delete_thread(thread_id)
+
+    async def _adelete(self, thread_id: str):
+        print(f"Deleting conversation thread {thread_id}")
+        await self.checkpointer.adelete_thread(thread_id)
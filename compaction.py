@@ -0,0 +1,99 @@
+import os
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+
+# Compaction starts once the conversation is estimated to exceed this many tokens
+COMPACT_TOKEN_BUDGET = int(os.getenv("COMPACT_TOKEN_BUDGET", "12000"))
+# The last N user turns (and everything after them) are never compacted
+KEEP_RECENT_TURNS = int(os.getenv("COMPACT_KEEP_RECENT_TURNS", "2"))
+# Tool outputs and tool-call arguments smaller than this are left alone
+MIN_COMPACT_CHARS = 2000
+PREVIEW_CHARS = 400
+CHARS_PER_TOKEN = 4
+
+COMPACTED_MARKER = "[Compacted"
+
+
+def _content_chars(message) -> int:
+    size = len(message.content) if isinstance(message.content, str) else len(str(message.content))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        size += sum(len(str(v)) for v in tool_call["args"].values())
+    return size
+
+
+def estimate_tokens(messages) -> int:
+    return sum(_content_chars(m) for m in messages) // CHARS_PER_TOKEN
+
+
+def _compact_tool_message(message: ToolMessage, call: dict | None) -> ToolMessage:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    name = call["name"] if call else (message.name or "tool")
+    args = ", ".join(f"{k}={v!r}" for k, v in (call or {}).get("args", {}).items())
+    preview = " ".join(content[:PREVIEW_CHARS].split())
+    summary = (f"{COMPACTED_MARKER} {name}({args}) output: {len(content)} characters. "
+               f"Beginning: {preview} ... Call the tool again if you need the full content.]")
+    return message.model_copy(update={"content": summary})
+
+
+def _compact_tool_calls(message: AIMessage) -> AIMessage:
+    tool_calls = []
+    for tool_call in message.tool_calls:
+        args = {
+            k: (f"{COMPACTED_MARKER} {len(v)} characters]"
+                if isinstance(v, str) and len(v) >= MIN_COMPACT_CHARS else v)
+            for k, v in tool_call["args"].items()
+        }
+        tool_calls.append({**tool_call, "args": args})
+    additional_kwargs = {k: v for k, v in message.additional_kwargs.items() if k != "tool_calls"}
+    return message.model_copy(update={"tool_calls": tool_calls,
+                                      "additional_kwargs": additional_kwargs})
+
+
+def _has_large_args(message: AIMessage) -> bool:
+    return any(isinstance(v, str) and len(v) >= MIN_COMPACT_CHARS
+               and not v.startswith(COMPACTED_MARKER)
+               for tool_call in message.tool_calls for v in tool_call["args"].values())
+
+
+def compact_messages(messages: list, budget: int = COMPACT_TOKEN_BUDGET,
+                     keep_recent_turns: int = KEEP_RECENT_TURNS) -> list:
+    """Return replacement messages that bring the conversation under `budget` tokens.
+
+    Large tool outputs and large tool-call arguments (e.g. full paper texts
+    and LaTeX bodies) are replaced, oldest first, by short references that
+    keep the same message ids. System messages and the most recent
+    `keep_recent_turns` user turns (at least the current one, so the model
+    always sees the tool outputs of the turn it is working on) are never
+    touched.
+    """
+    total = estimate_tokens(messages)
+    if total <= budget:
+        return []
+
+    human_positions = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if not human_positions:
+        return []
+    # The current turn is always kept, and a short conversation is kept from its first turn
+    protected_from = human_positions[-min(max(keep_recent_turns, 1), len(human_positions))]
+    calls = {tool_call["id"]: tool_call
+             for m in messages if isinstance(m, AIMessage)
+             for tool_call in m.tool_calls}
+
+    replacements = []
+    for message in messages[:protected_from]:
+        if total <= budget:
+            break
+        if isinstance(message, SystemMessage):
+            continue
+        if isinstance(message, ToolMessage):
+            content = message.content if isinstance(message.content, str) else str(message.content)
+            if len(content) < MIN_COMPACT_CHARS or content.startswith(COMPACTED_MARKER):
+                continue
+            compacted = _compact_tool_message(message, calls.get(message.tool_call_id))
+        elif isinstance(message, AIMessage) and _has_large_args(message):
+            compacted = _compact_tool_calls(message)
+        else:
+            continue
+        total -= (_content_chars(message) - _content_chars(compacted)) // CHARS_PER_TOKEN
+        replacements.append(compacted)
+    return replacements
@@ -1,29 +1,62 @@
+import uuid
 import streamlit as st
-from ai_researcher import INITIAL_PROMPT, graph, config
+from ai_researcher import get_graph
+from chat_service import start_turn, clear_chat_history, chunk_events
 from pathlib import Path
 import logging
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@st.cache_resource
+def load_graph():
+    # Streamlit re-executes this script on every interaction; the compiled
+    # graph and its model client are built once per process and shared
+    return get_graph()
+
+
 # Basic app config
 st.set_page_config(page_title="Research AI Agent", page_icon="📄")
 st.title("📄 Research AI Agent")
 
 # Initialize session state
+if "session_id" not in st.session_state:
+    # Each browser session gets its own checkpointed graph thread
+    st.session_state.session_id = uuid.uuid4().hex
+    logger.info(f"Started session {st.session_state.session_id}")
+
 if "chat_history" not in st.session_state:
+    # Display copy only; the agent's conversation lives in the graph thread
     st.session_state.chat_history = []
     logger.info("Initialized chat history")
 
 if "pdf_path" not in st.session_state:
     st.session_state.pdf_path = None
 
+graph = load_graph()
+
+if st.sidebar.button("Clear chat"):
+    clear_chat_history(st.session_state.session_id)
+    st.session_state.chat_history = []
+    st.session_state.pdf_path = None
+
 # Display existing chat history
 for msg in st.session_state.chat_history:
     st.chat_message(msg["role"]).write(msg["content"])
 
+
+def show_pdf_download(pdf_path):
+    path = Path(pdf_path)
+    if path.exists():
+        st.download_button("📥 Download PDF", path.read_bytes(), file_name=path.name,
+                           mime="application/pdf", key=f"pdf-{path.name}")
+
+
+if st.session_state.pdf_path:
+    show_pdf_download(st.session_state.pdf_path)
+
 # Chat interface
 user_input = st.chat_input("What research topic would you like to explore?")
 
@@ -33,55 +66,28 @@ if user_input:
     st.session_state.chat_history.append({"role": "user", "content": user_input})
     st.chat_message("user").write(user_input)
 
-    # Prepare input for the agent
-    chat_input = {
-        "messages": [
-            {"role": "system", "content": INITIAL_PROMPT}
-        ] + st.session_state.chat_history
-    }
+    # Only the new message is sent; earlier turns come from the session's thread
+    chat_input, config = start_turn(st.session_state.session_id, user_input)
     logger.info("Starting agent processing...")
 
     # Stream agent response
     full_response = ""
+    new_pdf = None
     response_placeholder = st.chat_message("assistant").empty()
-    
+
     try:
         # Use stream_mode="updates" to get node updates
         for chunk in graph.stream(chat_input, config, stream_mode="updates"):
             logger.info(f"Received chunk with keys: {chunk.keys()}")
-            
-            # Check for agent node updates
-            if "agent" in chunk:
-                agent_output = chunk["agent"]
-                if "messages" in agent_output:
-                    messages = agent_output["messages"]
-                    for message in messages:
-                        # Handle tool calls (log only)
-                        if hasattr(message, "tool_calls") and message.tool_calls:
-                            for tool_call in message.tool_calls:
-                                logger.info(f"Tool call: {tool_call['name']}")
-                                response_placeholder.info(f"🔧 Calling tool: {tool_call['name']}...")
-                        
-                        # Handle assistant response
-                        if isinstance(message, AIMessage) and message.content:
-                            if isinstance(message.content, str):
-                                text_content = message.content
-                            elif isinstance(message.content, list):
-                                # Handle case where content is a list of content blocks
-                                text_content = "".join(
-                                    block.get("text", "") if isinstance(block, dict) else str(block)
-                                    for block in message.content
-                                )
-                            else:
-                                text_content = str(message.content)
-                            
-                            if text_content.strip():
-                                full_response = text_content
-                                response_placeholder.markdown(full_response)
-            
-            # Check for tools node updates (optional logging)
-            if "tools" in chunk:
-                logger.info("Tool execution completed")
+            for event in chunk_events(chunk):
+                if event['type'] == 'tool_call':
+                    logger.info(f"Tool call: {event['name']}")
+                    response_placeholder.info(f"🔧 Calling tool: {event['name']}...")
+                elif event['type'] == 'content':
+                    full_response = event['content']
+                    response_placeholder.markdown(full_response)
+                elif event['type'] == 'pdf':
+                    new_pdf = event['path']
 
     except Exception as e:
         logger.error(f"Error during agent processing: {str(e)}", exc_info=True)
@@ -92,3 +98,7 @@ if user_input:
         st.session_state.chat_history.append({"role": "assistant", "content": full_response})
     else:
         st.warning("No response generated. Please try again.")
+
+    if new_pdf:
+        st.session_state.pdf_path = new_pdf
+        show_pdf_download(new_pdf)
@@ -0,0 +1,91 @@
+import os
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# (connect, read) timeouts in seconds; a stalled download fails instead of hanging
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "1.0"))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+# Maximum number of simultaneous requests to any one host
+MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "4"))
+
+_session = None
+_session_lock = threading.Lock()
+_host_limits = {}
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=[429, 503],
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "ai-research-agent/1.0"
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide keep-alive session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def _host_limit(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc.lower()
+    with _session_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+        return _host_limits[host]
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET a URL through the shared pooled session.
+
+    Applies the default timeouts, retries 429/503 responses with exponential
+    backoff (honouring Retry-After) and caps concurrent requests per host.
+    The response body is read before the host slot is released.
+    """
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    with _host_limit(url):
+        response = get_session().get(url, **kwargs)
+        # Touch the body so the download happens while holding the host slot
+        response.content
+        return response
+
+
+@contextmanager
+def stream(url: str, **kwargs):
+    """GET a URL without buffering the body, for incremental parsing.
+
+    Use as a context manager; the host slot and connection are held until
+    the block exits.
+    """
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    with _host_limit(url):
+        response = get_session().get(url, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            response.close()
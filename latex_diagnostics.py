@@ -0,0 +1,121 @@
+import os
+import re
+import json
+from dataclasses import dataclass, asdict, field
+
+
+# Upper bound on the size of the diagnostics returned to the model
+DIAGNOSTICS_TOKEN_BUDGET = int(os.getenv("DIAGNOSTICS_TOKEN_BUDGET", "800"))
+CHARS_PER_TOKEN = 4
+CONTEXT_LINES = 1
+MAX_LINE_CHARS = 160
+
+# e.g. "error: paper.tex:38: Undefined control sequence"
+#      "warning: paper.tex:12: Overfull \hbox (3.2pt too wide) in paragraph"
+_LINE_DIAGNOSTIC_RE = re.compile(r'^(error|warning): [^:\n]+\.tex:(\d+): (.+)$', re.MULTILINE)
+_GENERAL_ERROR_RE = re.compile(r'^error: (.+)$', re.MULTILINE)
+# Tectonic's summary lines carry no information beyond the errors themselves
+_NOISE = ("halted on potentially-recoverable error", "See the LaTeX manual")
+# Box warnings are rarely worth a retry
+_LOW_PRIORITY = ("Overfull", "Underfull")
+# Tectonic's own messages, as opposed to TeX errors at a source line (which
+# may echo back source text such as "l.12 We add residual connections")
+_ENGINE_LINE_RE = re.compile(r'^(?:error|warning|caused by): (?![^:\n]+\.tex:\d+:)(.+)$', re.MULTILINE)
+# Engine failures that may go away on their own: tectonic fetches packages and
+# fonts on demand. A missing file alone is not one (the package may not exist).
+_TRANSIENT_RE = re.compile(
+    r"download|fetch|retriev|network|connect|timed out|temporar|HTTP|DNS|I/O error|No space left",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Diagnostic:
+    severity: str
+    line: int | None
+    message: str
+    context: list[str] = field(default_factory=list)
+
+
+def _context(lines: list[str], line: int) -> list[str]:
+    start = max(1, line - CONTEXT_LINES)
+    stop = min(len(lines), line + CONTEXT_LINES)
+    return [f"{n}: {lines[n - 1][:MAX_LINE_CHARS]}" for n in range(start, stop + 1)]
+
+
+def parse_tectonic_output(stderr: str, latex_content: str) -> list[Diagnostic]:
+    """Extract every error and warning tectonic reported, with source context."""
+    lines = latex_content.split("\n")
+    diagnostics = []
+    seen = set()
+    for severity, line, message in _LINE_DIAGNOSTIC_RE.findall(stderr):
+        line = int(line)
+        key = (severity, line, message.strip())
+        if key in seen:
+            continue
+        seen.add(key)
+        context = _context(lines, line) if 1 <= line <= len(lines) else []
+        diagnostics.append(Diagnostic(severity, line, message.strip(), context))
+    for message in _GENERAL_ERROR_RE.findall(stderr):
+        if _LINE_DIAGNOSTIC_RE.match(f"error: {message}") or any(n in message for n in _NOISE):
+            continue
+        if ("error", None, message.strip()) not in seen:
+            seen.add(("error", None, message.strip()))
+            diagnostics.append(Diagnostic("error", None, message.strip()))
+    return diagnostics
+
+
+def is_transient_failure(stderr: str) -> bool:
+    """Whether a failed compilation may succeed when the same source is retried.
+
+    Only tectonic's own download, network and I/O errors count; TeX errors
+    at a source line are deterministic.
+    """
+    return any(_TRANSIENT_RE.search(line) for line in _ENGINE_LINE_RE.findall(stderr or ""))
+
+
+def diagnostics_from_lint(lint_errors, latex_content: str) -> list[Diagnostic]:
+    """Convert latex_lint findings into diagnostics of the same severity."""
+    lines = latex_content.split("\n")
+    return [Diagnostic(e.severity, e.line, e.message, _context(lines, e.line)) for e in lint_errors]
+
+
+def _priority(diagnostic: Diagnostic):
+    return (
+        diagnostic.severity != "error",
+        any(diagnostic.message.startswith(p) for p in _LOW_PRIORITY),
+        diagnostic.line or 0,
+    )
+
+
+def format_diagnostics(diagnostics: list[Diagnostic], stderr: str = "",
+                       max_tokens: int = DIAGNOSTICS_TOKEN_BUDGET) -> str:
+    """Render diagnostics as a compact JSON list capped to a token budget.
+
+    Errors come first, then warnings; whatever does not fit the budget is
+    summarised as a count. With no parsed diagnostics, the tail of stderr is
+    returned instead of the whole log.
+    """
+    budget = max_tokens * CHARS_PER_TOKEN
+    if not diagnostics:
+        tail = stderr.strip()[-budget:]
+        return (f"LaTeX compilation failed: {tail}\n"
+                f"Please fix the LaTeX errors and try again.")
+
+    errors = sum(d.severity == "error" for d in diagnostics)
+    warnings = len(diagnostics) - errors
+    items = []
+    used = 0
+    for diagnostic in sorted(diagnostics, key=_priority):
+        item = json.dumps({k: v for k, v in asdict(diagnostic).items() if v not in (None, [])},
+                          separators=(",", ":"), ensure_ascii=False)
+        if items and used + len(item) > budget:
+            break
+        items.append(item)
+        used += len(item)
+    omitted = len(diagnostics) - len(items)
+
+    return (f"LaTeX compilation failed with {errors} error(s) and {warnings} warning(s).\n"
+            f"Diagnostics:\n[{','.join(items)}]\n"
+            + (f"({omitted} more diagnostic(s) omitted.)\n" if omitted else "")
+            + "Please fix ALL of the errors above in one revision and try again.")
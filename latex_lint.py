@@ -0,0 +1,236 @@
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+
+
+# Commands available in every document (LaTeX kernel + standard class commands)
+BASE_COMMANDS = set("""
+documentclass usepackage begin end input include title author date maketitle today thanks and
+part section subsection subsubsection paragraph subparagraph appendix tableofcontents
+listoffigures listoftables label ref pageref cite nocite bibliography bibliographystyle bibitem
+footnote footnotemark footnotetext emph textbf textit texttt textrm textsf textsc textsl textup
+textnormal textmd underline bfseries itshape ttfamily rmfamily sffamily scshape mdseries upshape
+slshape normalfont em bf it tt rm sf sc sl tiny scriptsize footnotesize small normalsize large Large
+LARGE huge Huge item newline linebreak nolinebreak pagebreak nopagebreak newpage clearpage
+cleardoublepage noindent indent par hspace vspace hfill vfill hfil vfil smallskip medskip bigskip
+centering raggedright raggedleft caption newcommand renewcommand providecommand newenvironment
+renewenvironment newtheorem newcounter def let edef gdef makeatletter makeatother setlength
+addtolength settowidth setcounter addtocounter stepcounter refstepcounter value arabic roman Roman
+alph Alph fnsymbol the thepage thesection thesubsection theequation textwidth linewidth textheight
+columnwidth paperwidth paperheight baselineskip baselinestretch parindent parskip tabcolsep
+arraystretch hline cline vline multicolumn tabularnewline ldots dots cdots vdots ddots quad qquad
+LaTeX TeX LaTeXe mbox makebox fbox framebox parbox raisebox rule kern hbox vbox protect enspace
+thinspace negthinspace nobreakspace textbackslash textasciitilde textasciicircum textbar textless
+textgreater textendash textemdash textquoteleft textquoteright textquotedblleft textquotedblright
+textbullet textdagger textdegree textregistered texttrademark copyright S P dag ddag pounds
+addcontentsline addvspace centerline relax null ignorespaces string expandafter csname endcsname
+noexpand relsize onecolumn twocolumn pagestyle thispagestyle pagenumbering markboth markright
+author title abstractname refname contentsname figurename tablename footnoterule frac sqrt sum prod
+coprod int oint lim limsup liminf sup inf max min arg det exp log ln lg sin cos tan sec csc cot arcsin
+arccos arctan sinh cosh tanh coth dim ker deg gcd hom Pr left right big Big bigg Bigg bigl bigr
+Bigl Bigr biggl biggr Biggl Biggr bigm Bigm middle alpha beta gamma delta epsilon varepsilon zeta
+eta theta vartheta iota kappa lambda mu nu xi pi varpi rho varrho sigma varsigma tau upsilon phi
+varphi chi psi omega Gamma Delta Theta Lambda Xi Pi Sigma Upsilon Phi Psi Omega infty partial
+nabla cdot times div pm mp leq geq le ge neq ne approx equiv sim simeq cong propto in notin ni
+subset subseteq supset supseteq cup cap bigcup bigcap setminus emptyset forall exists neg lnot
+land lor wedge vee bigwedge bigvee rightarrow leftarrow Rightarrow Leftarrow leftrightarrow
+Leftrightarrow to gets mapsto longrightarrow longleftarrow Longrightarrow Longleftarrow
+longleftrightarrow Longleftrightarrow longmapsto uparrow downarrow Uparrow Downarrow updownarrow
+nearrow searrow swarrow nwarrow hookrightarrow hookleftarrow rightharpoonup leftharpoonup iff
+hat bar tilde vec dot ddot acute grave check breve overline widehat widetilde overbrace underbrace
+overrightarrow overleftarrow mathrm mathbf mathit mathsf mathtt mathcal mathnormal displaystyle
+textstyle scriptstyle scriptscriptstyle limits nolimits prime ell hbar imath jmath Re Im aleph wp
+circ bullet star ast oplus ominus otimes oslash odot bigoplus bigotimes bigodot uplus biguplus
+sqcup sqcap bigsqcup langle rangle lfloor rfloor lceil rceil vert Vert mid parallel perp angle
+triangle triangleleft triangleright bigtriangleup bigtriangledown top bot dagger ddagger ll gg prec
+succ preceq succeq sqsubseteq sqsupseteq vdash dashv models smile frown bowtie asymp doteq amalg
+diamond heartsuit spadesuit clubsuit diamondsuit flat natural sharp surd neg colon stackrel
+atop over choose buildrel mathop mathbin mathrel mathord mathpunct mathopen mathclose phantom
+hphantom vphantom smash not cal bmod pmod pod lbrace rbrace lbrack rbrack backslash leftrightharpoons
+newblock underline mathstrut strut fontsize selectfont usefont fontfamily fontseries fontshape lq rq
+textsuperscript textsubscript textcircled ensuremath hrulefill dotfill vskip hskip vglue hglue vss
+hss hrule vrule sloppy fussy allowbreak nobreak break penalty hyphenation frenchspacing
+nonfrenchspacing space enskip negmedspace enspace columnsep topmargin oddsidemargin evensidemargin
+headheight headsep footskip marginpar marginparwidth marginparsep reversemarginpar leftmargin
+itemsep topsep labelsep labelwidth fboxsep fboxrule unitlength includeonly halign valign noalign
+cr crcr omit span tabskip vfilneg hfilneg vspace hspace ss ae AE oe OE aa AA o O l L i j
+textvisiblespace textperiodcentered textsection textparagraph textcopyright
+textunderscore textbraceleft textbraceright textdollar textexclamdown textquestiondown
+guillemotleft guillemotright quotedblbase quotesinglbase flushbottom raggedbottom samepage
+enlargethispage newpage suppressfloats listfiles stretch fill newlength newsavebox sbox savebox
+usebox ifthenelse ifx else fi newif iftrue iffalse advance multiply divide global long outer
+unskip kill footnotesep
+""".split())
+
+# Commands added by each supported document class; names are not checked for other classes
+CLASS_COMMANDS = {
+    "article": set(),
+    "amsart": set("address email keywords subjclass dedicatory curraddr urladdr".split()),
+    "report": {"chapter"},
+    "book": set("chapter frontmatter mainmatter backmatter".split()),
+}
+
+# Commands added by each supported package
+PACKAGE_COMMANDS = {
+    "amsmath": set("""
+        text intertext tag notag nonumber eqref boldsymbol pmb substack DeclareMathOperator
+        operatorname numberwithin allowdisplaybreaks binom dbinom tbinom tfrac dfrac cfrac overset
+        underset xrightarrow xleftarrow lvert rvert lVert rVert iint iiint idotsint dots dotsc dotsb
+        dotsm dotsi dotso genfrac sideset shoveleft shoveright mspace varGamma varDelta varTheta
+        varLambda varXi varPi varSigma varUpsilon varPhi varPsi varOmega hdotsfor mathring
+        smash implies impliedby AmS medspace thickspace negmedspace negthickspace Bmatrix
+    """.split()),
+    "amssymb": set("""
+        mathbb mathfrak leqslant geqslant therefore because square blacksquare checkmark varnothing
+        lesssim gtrsim triangleq nmid nleq ngeq nless ngtr nsubseteq nsupseteq subsetneq supsetneq
+        complement ltimes rtimes circledast circledcirc boxplus boxtimes boxdot lozenge blacklozenge
+        blacktriangle vartriangle curlyeqprec curlyeqsucc eqsim approxeq backsim leftleftarrows
+        rightrightarrows twoheadrightarrow twoheadleftarrow rightsquigarrow leadsto Box Diamond mho
+        beth gimel daleth digamma varkappa hslash nexists Finv Game Bbbk upharpoonright restriction
+        llcorner lrcorner ulcorner urcorner vDash Vdash nvdash nvDash measuredangle sphericalangle
+        lll ggg leqq geqq lessgtr gtrless smallsetminus divideontimes intercal doublebarwedge
+    """.split()),
+    "amsfonts": set("mathbb mathfrak".split()),
+    "amsthm": set("theoremstyle qedhere qed qedsymbol proofname newtheoremstyle".split()),
+    "hyperref": set("url href hyperref hypersetup autoref nameref texorpdfstring phantomsection hyperlink hypertarget".split()),
+    "url": set("url urlstyle".split()),
+    "graphicx": set("includegraphics graphicspath scalebox resizebox rotatebox reflectbox".split()),
+    "geometry": set("geometry newgeometry restoregeometry".split()),
+    "xcolor": set("color textcolor colorbox fcolorbox definecolor pagecolor".split()),
+    "color": set("color textcolor colorbox fcolorbox definecolor pagecolor".split()),
+    "booktabs": set("toprule midrule bottomrule cmidrule addlinespace specialrule".split()),
+    "natbib": set("citep citet citealp citealt citeauthor citeyear setcitestyle bibpunct".split()),
+    "cite": set(),
+    "inputenc": set(),
+    "fontenc": set(),
+    "times": set(),
+    "lmodern": set(),
+    "microtype": set(),
+    "setspace": set("doublespacing onehalfspacing singlespacing setstretch".split()),
+}
+
+BASE_ENVIRONMENTS = set("""
+document abstract itemize enumerate description list center flushleft flushright quote quotation
+verse verbatim verbatim* figure figure* table table* tabular tabular* array equation equation*
+eqnarray eqnarray* minipage thebibliography titlepage picture math displaymath trivlist
+""".split())
+
+PACKAGE_ENVIRONMENTS = {
+    "amsmath": set("""
+        align align* gather gather* multline multline* split aligned gathered alignedat cases
+        matrix pmatrix bmatrix Bmatrix vmatrix Vmatrix smallmatrix alignat alignat* flalign
+        flalign* subequations
+    """.split()),
+    "amsthm": {"proof"},
+}
+
+# Definitions that introduce new command or environment names
+_DEFINITION_RE = re.compile(
+    r'\\(?:(?:re)?newcommand|providecommand|DeclareMathOperator)\*?\s*\{?\\([A-Za-z@]+)'
+    r'|\\(?:def|let|gdef|edef)\s*\\([A-Za-z@]+)'
+    r'|\\(?:re)?newenvironment\s*\{([^}]+)\}'
+    r'|\\newtheorem\*?\s*\{([^}]+)\}'
+)
+_CLASS_RE = re.compile(r'\\documentclass(?:\[[^\]]*\])?\{([^}]+)\}')
+_PACKAGE_RE = re.compile(r'\\usepackage(?:\[[^\]]*\])?\{([^}]+)\}')
+_TOKEN_RE = re.compile(
+    r'\\begin\s*\{(?P<begin>[^}]*)\}'
+    r'|\\end\s*\{(?P<end>[^}]*)\}'
+    r'|\\(?:url|href)\s*\{[^}\n]*\}'  # URLs may contain % and # literally
+    r'|\\verb(?P<delim>[^A-Za-z\s]).*?(?P=delim)'
+    r'|\\(?P<command>[A-Za-z@]+)'
+    r'|\\.'
+    r'|%[^\n]*'
+    r'|(?P<open>\{)'
+    r'|(?P<close>\})',
+    re.DOTALL,
+)
+_VERBATIM_ENVIRONMENTS = {"verbatim", "verbatim*", "lstlisting", "minted", "comment"}
+
+
+@dataclass
+class LintError:
+    line: int
+    message: str
+    # "error" for structural problems tectonic cannot get past; undefined
+    # names are only "warning"s, since the whitelist cannot know every macro
+    severity: str = "error"
+
+
+def lint_latex(latex_content: str) -> list[LintError]:
+    """Statically check a LaTeX document for errors that would stop tectonic.
+
+    Checks brace balance and \\begin/\\end pairing (errors) and - when the
+    document class and every loaded package are ones we know - that commands
+    and environments are defined (warnings).
+    """
+    newlines = [m.start() for m in re.finditer("\n", latex_content)]
+
+    def line_of(offset):
+        return bisect_right(newlines, offset - 1) + 1
+
+    packages = {p.strip() for group in _PACKAGE_RE.findall(latex_content) for p in group.split(",")}
+    document_class = _CLASS_RE.search(latex_content)
+    document_class = document_class.group(1).strip() if document_class else "article"
+    check_names = (document_class in CLASS_COMMANDS and packages <= PACKAGE_COMMANDS.keys()
+                   and r'\makeatletter' not in latex_content)
+    commands = BASE_COMMANDS | CLASS_COMMANDS.get(document_class, set())
+    environments = set(BASE_ENVIRONMENTS)
+    for package in packages:
+        commands |= PACKAGE_COMMANDS.get(package, set())
+        environments |= PACKAGE_ENVIRONMENTS.get(package, set())
+    for match in _DEFINITION_RE.finditer(latex_content):
+        command, macro, environment, theorem = match.groups()
+        if command or macro:
+            commands.add(command or macro)
+        else:
+            environments.add((environment or theorem).strip())
+
+    errors = []
+    braces = []
+    env_stack = []
+    pos = 0
+    while pos < len(latex_content):
+        match = _TOKEN_RE.search(latex_content, pos)
+        if match is None:
+            break
+        pos = match.end()
+        line = line_of(match.start())
+
+        if match.group("begin") is not None:
+            name = match.group("begin").strip()
+            if check_names and name not in environments:
+                errors.append(LintError(line, f"LaTeX Error: Environment {name} undefined.", "warning"))
+            env_stack.append((name, line))
+            if name in _VERBATIM_ENVIRONMENTS:
+                # Skip the verbatim body untouched
+                end = latex_content.find(f"\\end{{{name}}}", pos)
+                pos = len(latex_content) if end == -1 else end
+        elif match.group("end") is not None:
+            name = match.group("end").strip()
+            if not env_stack:
+                errors.append(LintError(line, f"LaTeX Error: \\end{{{name}}} without matching \\begin."))
+            else:
+                open_name, open_line = env_stack.pop()
+                if open_name != name:
+                    errors.append(LintError(
+                        line, f"LaTeX Error: \\begin{{{open_name}}} on input line {open_line} "
+                              f"ended by \\end{{{name}}}."))
+        elif match.group("command") is not None:
+            if check_names and match.group("command") not in commands:
+                errors.append(LintError(line, f"Undefined control sequence \\{match.group('command')}.",
+                                         "warning"))
+        elif match.group("open") is not None:
+            braces.append(line)
+        elif match.group("close") is not None:
+            if braces:
+                braces.pop()
+            else:
+                errors.append(LintError(line, "Too many }'s."))
+
+    for open_line in braces:
+        errors.append(LintError(open_line, "Missing } inserted: this { is never closed."))
+    for name, open_line in env_stack:
+        errors.append(LintError(open_line, f"LaTeX Error: \\begin{{{name}}} is never ended."))
+
+    return sorted(errors, key=lambda e: e.line)
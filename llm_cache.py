@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from langchain_core.messages import AIMessage, ToolMessage, message_to_dict, messages_from_dict
+
+
+# Set LLM_CACHE=1 to answer repeated model calls from the on-disk cache
+LLM_CACHE = os.getenv("LLM_CACHE", "0") == "1"
+
+# Message fields that differ between otherwise identical conversations
+_VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def _model_params(model) -> dict:
+    """Model name/settings and bound tool schemas of a (tool-bound) chat model."""
+    base, bound_kwargs = (model.bound, model.kwargs) if hasattr(model, "bound") else (model, {})
+    # ChatGroq reports its model name and sampling settings in _default_params
+    params = dict(getattr(base, "_default_params", None) or getattr(base, "_identifying_params", None) or {})
+    return {"class": type(base).__name__, "model": params, "kwargs": bound_kwargs}
+
+
+def _canonical_messages(messages) -> list[dict]:
+    # Tool call ids are random per conversation; number them by first appearance instead
+    call_ids = {}
+
+    def call_id(original):
+        return call_ids.setdefault(original, f"call_{len(call_ids)}")
+
+    canonical = []
+    for message in messages:
+        data = {k: v for k, v in message_to_dict(message)["data"].items()
+                if k not in _VOLATILE_FIELDS and v not in (None, {}, [], "")}
+        if isinstance(message, AIMessage):
+            if message.tool_calls:
+                data["tool_calls"] = [{"name": c["name"], "args": c["args"], "id": call_id(c["id"])}
+                                      for c in message.tool_calls]
+            data.pop("invalid_tool_calls", None)
+        elif isinstance(message, ToolMessage):
+            data["tool_call_id"] = call_id(message.tool_call_id)
+        canonical.append({"type": message.type, **data})
+    return canonical
+
+
+class LLMCache:
+    """On-disk cache of chat model responses keyed by a hash of the request.
+
+    The key covers the canonicalized messages, the model parameters and the
+    bound tool schemas, so any change to the prompt, model or tools is a
+    miss. Entries expire after `ttl` seconds; total size is bounded and the
+    least recently used entries are evicted first.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, ttl: float):
+        self.cache_dir = Path(cache_dir).absolute()
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.index_file = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+        self._index = None
+
+    @staticmethod
+    def key(messages, model) -> str:
+        payload = {"messages": _canonical_messages(messages), "params": _model_params(model)}
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _load_index(self) -> dict:
+        if self._index is None:
+            try:
+                self._index = json.loads(self.index_file.read_text())
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps(self._index))
+        tmp_file.replace(self.index_file)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def lookup(self, key: str) -> AIMessage | None:
+        """Return the cached response for a request hash, if fresh."""
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            try:
+                if time.time() - entry["created"] > self.ttl:
+                    raise FileNotFoundError(key)
+                data = json.loads(self._entry_path(key).read_text())
+            except (OSError, ValueError):
+                del index[key]
+                self._entry_path(key).unlink(missing_ok=True)
+                self._save_index()
+                return None
+            entry["last_access"] = time.time()
+            self._save_index()
+        message = messages_from_dict([data])[0]
+        # A fresh id, so replaying the response in a thread never replaces an earlier message
+        message.id = None
+        message.response_metadata = {**message.response_metadata, "cached": True}
+        return message
+
+    def store(self, key: str, message: AIMessage):
+        """Remember a model response."""
+        text = json.dumps(message_to_dict(message))
+        with self._lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._entry_path(key).write_text(text)
+            now = time.time()
+            self._load_index()[key] = {"size": len(text), "created": now, "last_access": now}
+            self._evict()
+            self._save_index()
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            for key in list(self._load_index()):
+                self._entry_path(key).unlink(missing_ok=True)
+            self._index = {}
+            self._save_index()
+
+    def _evict(self):
+        index = self._index
+        now = time.time()
+        for key in [k for k, e in index.items() if now - e["created"] > self.ttl]:
+            index.pop(key)
+            self._entry_path(key).unlink(missing_ok=True)
+        total = sum(e["size"] for e in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= index.pop(key)["size"]
+            self._entry_path(key).unlink(missing_ok=True)
+
+
+def cache_enabled(config: dict | None) -> bool:
+    """Whether a run may use the cache; pass {"configurable": {"llm_cache": False}} to bypass it."""
+    return (config or {}).get("configurable", {}).get("llm_cache", True) is not False
+
+
+llm_cache = LLMCache(
+    cache_dir=os.getenv("LLM_CACHE_DIR", "cache/llm"),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024))),
+    ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 60 * 60))),
+)
@@ -0,0 +1,235 @@
+import os
+import re
+import zlib
+import threading
+from collections import OrderedDict, defaultdict
+import numpy as np
+from paper_index import paper_key
+
+
+# Estimated Jaccard similarity (of word shingles) above which two texts count as near-duplicates
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.7"))
+# Bounds on remembered abstracts and on conversations with a read history
+DEDUP_MAX_PAPERS = int(os.getenv("DEDUP_MAX_PAPERS", "20000"))
+DEDUP_MAX_THREADS = int(os.getenv("DEDUP_MAX_THREADS", "500"))
+
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity share a bucket with high probability
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_WORDS = 3
+_PRIME = (1 << 31) - 1
+_BLOCK = 4096
+
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str) -> np.ndarray:
+    """Hashes of the distinct word n-grams of a text."""
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < SHINGLE_WORDS:
+        grams = {" ".join(words)} if words else set()
+    else:
+        grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) % _PRIME for g in grams),
+                       dtype=np.uint64, count=len(grams))
+
+
+def minhash(text: str) -> np.ndarray | None:
+    """MinHash signature of a text, or None if it has no words."""
+    hashes = shingles(text)
+    if not len(hashes):
+        return None
+    signature = np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    # Blocks keep the shingles x permutations matrix small for full papers
+    for start in range(0, len(hashes), _BLOCK):
+        block = hashes[start:start + _BLOCK, None]
+        np.minimum(signature, ((block * _A + _B) % _PRIME).min(axis=0), out=signature)
+    return signature
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+class LSHIndex:
+    """Banded locality-sensitive hashing over MinHash signatures."""
+
+    def __init__(self):
+        self.signatures = {}
+        self._buckets = defaultdict(set)
+
+    def _bands(self, signature: np.ndarray):
+        for band in range(LSH_BANDS):
+            yield band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()
+
+    def add(self, key: str, signature: np.ndarray):
+        self.remove(key)
+        self.signatures[key] = signature
+        for bucket in self._bands(signature):
+            self._buckets[bucket].add(key)
+
+    def remove(self, key: str):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket in self._bands(signature):
+            keys = self._buckets.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[bucket]
+
+    def query(self, signature: np.ndarray, threshold: float = DUPLICATE_THRESHOLD,
+              exclude: str | None = None) -> list[tuple[str, float]]:
+        """Indexed keys whose estimated similarity reaches `threshold`, most similar first."""
+        candidates = set()
+        for bucket in self._bands(signature):
+            candidates |= self._buckets.get(bucket, set())
+        candidates.discard(exclude)
+        scored = [(key, similarity(signature, self.signatures[key])) for key in candidates]
+        return sorted([(k, s) for k, s in scored if s >= threshold], key=lambda ks: -ks[1])
+
+
+class _ReadHistory:
+    def __init__(self):
+        self.papers = {}  # paper key -> {"url", "title"}
+        self.abstracts = LSHIndex()
+        self.texts = LSHIndex()
+
+
+def thread_of(config: dict | None) -> str:
+    """Conversation a tool call belongs to."""
+    return str((config or {}).get("configurable", {}).get("thread_id", "default"))
+
+
+class DuplicateTracker:
+    """Finds near-duplicate papers among search results and what was already read.
+
+    Abstracts from every arXiv search are signed once and remembered. Each
+    conversation keeps its own history of read papers, by abstract and by
+    full text, so a near-duplicate under a different arXiv id can be flagged
+    before it is downloaded (by abstract) or before its text is returned
+    (by full text).
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD, max_papers: int = DEDUP_MAX_PAPERS,
+                 max_threads: int = DEDUP_MAX_THREADS):
+        self.threshold = threshold
+        self.max_papers = max_papers
+        self.max_threads = max_threads
+        self._abstracts = OrderedDict()  # paper key -> (signature, title)
+        self._histories = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, entry: dict):
+        key = paper_key(entry.get("id") or entry.get("pdf") or "")
+        if not key:
+            return None, None
+        known = self._abstracts.get(key)
+        if known is None:
+            signature = minhash(f"{entry.get('title') or ''} {entry.get('summary') or ''}")
+            if signature is None:
+                return key, None
+            known = self._abstracts[key] = (signature, (entry.get("title") or "").strip())
+            while len(self._abstracts) > self.max_papers:
+                self._abstracts.popitem(last=False)
+        self._abstracts.move_to_end(key)
+        return key, known[0]
+
+    def collapse(self, entries: list[dict]) -> list[dict]:
+        """Drop entries that duplicate an earlier one, listing them under it.
+
+        Other versions of the same paper and near-identical abstracts are
+        collapsed into the first occurrence as {"id", "title", "similarity"}
+        items of its "duplicates" list.
+        """
+        kept = []
+        by_key = {}
+        index = LSHIndex()
+        with self._lock:
+            for entry in entries:
+                key, signature = self._remember(entry)
+                match, score = (key, 1.0) if key in by_key else (None, 0.0)
+                if match is None and signature is not None:
+                    found = index.query(signature, self.threshold)
+                    if found:
+                        match, score = found[0]
+                if match is not None:
+                    by_key[match].setdefault("duplicates", []).append(
+                        {"id": entry.get("id"), "title": entry.get("title"), "similarity": round(score, 2)})
+                    continue
+                entry = dict(entry)
+                kept.append(entry)
+                if key:
+                    by_key[key] = entry
+                    if signature is not None:
+                        index.add(key, signature)
+        return kept
+
+    def _history(self, thread: str) -> _ReadHistory:
+        history = self._histories.get(thread)
+        if history is None:
+            history = self._histories[thread] = _ReadHistory()
+            while len(self._histories) > self.max_threads:
+                self._histories.popitem(last=False)
+        self._histories.move_to_end(thread)
+        return history
+
+    def _match(self, history: _ReadHistory, key: str, similarity: float) -> dict:
+        return {**history.papers[key], "similarity": round(similarity, 2)}
+
+    def read_duplicate(self, thread: str, url: str) -> dict | None:
+        """A paper read earlier in `thread` whose abstract nearly matches this one's.
+
+        Only other papers count; re-reading the same paper is not flagged.
+        Returns {"url", "title", "similarity"} or None.
+        """
+        key = paper_key(url)
+        with self._lock:
+            history = self._history(thread)
+            known = self._abstracts.get(key)
+            if known is None:
+                return None
+            found = history.abstracts.query(known[0], self.threshold, exclude=key)
+            return self._match(history, *found[0]) if found else None
+
+    def text_duplicate(self, thread: str, url: str, pages: list[str]) -> dict | None:
+        """A paper read earlier in `thread` whose full text nearly matches `pages`."""
+        signature = minhash("\n".join(pages))
+        if signature is None:
+            return None
+        key = paper_key(url)
+        with self._lock:
+            history = self._history(thread)
+            found = history.texts.query(signature, self.threshold, exclude=key)
+            return self._match(history, *found[0]) if found else None
+
+    def mark_read(self, thread: str, url: str, pages: list[str]):
+        """Add a paper to the read history of `thread`."""
+        signature = minhash("\n".join(pages))
+        key = paper_key(url)
+        with self._lock:
+            history = self._history(thread)
+            known = self._abstracts.get(key)
+            history.papers[key] = {"url": url, "title": known[1] if known else None}
+            if known is not None:
+                history.abstracts.add(key, known[0])
+            if signature is not None:
+                history.texts.add(key, signature)
+
+    def already_read(self, thread: str, entry: dict) -> dict | None:
+        """The read paper a search result is, or nearly duplicates, if any."""
+        key = paper_key(entry.get("id") or entry.get("pdf") or "")
+        with self._lock:
+            history = self._history(thread)
+            if key in history.papers:
+                return self._match(history, key, 1.0)
+        return self.read_duplicate(thread, entry.get("pdf") or key)
+
+
+duplicate_tracker = DuplicateTracker()
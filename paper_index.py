@@ -0,0 +1,157 @@
+import os
+import re
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+
+# Matches new-style (2401.01234v2) and old-style (hep-th/9901001v1) arXiv ids
+_ARXIV_ID_RE = re.compile(r'(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(v\d+)?')
+
+
+def paper_key(url_or_id: str) -> str:
+    """Canonical key for a paper: its version-less arXiv id, else the URL itself.
+
+    This lets /abs/ and /pdf/ links and different versions of the same paper
+    share one index entry.
+    """
+    match = _ARXIV_ID_RE.search(url_or_id or "")
+    return match.group(1) if match else url_or_id
+
+
+class PaperIndex:
+    """Local SQLite FTS5 full-text index of paper metadata and extracted text."""
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path).absolute()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS papers USING fts5(
+                    key UNINDEXED,
+                    url UNINDEXED,
+                    title,
+                    authors,
+                    summary,
+                    body,
+                    meta UNINDEXED,
+                    tokenize = 'porter unicode61'
+                );
+            """)
+        return self._conn
+
+    def _get(self, conn: sqlite3.Connection, key: str):
+        return conn.execute(
+            "SELECT rowid, url, title, authors, summary, body, meta FROM papers WHERE key = ?",
+            (key,),
+        ).fetchone()
+
+    def _upsert(self, conn, key, url, title, authors, summary, body, meta):
+        row = self._get(conn, key)
+        if row is None:
+            conn.execute(
+                "INSERT INTO papers (key, url, title, authors, summary, body, meta) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, title, authors, summary, body, meta),
+            )
+            return
+        rowid, old_url, old_title, old_authors, old_summary, old_body, old_meta = row
+        conn.execute(
+            "UPDATE papers SET url = ?, title = ?, authors = ?, summary = ?, body = ?, meta = ? "
+            "WHERE rowid = ?",
+            (url or old_url, title or old_title, authors or old_authors,
+             summary or old_summary, body or old_body, meta or old_meta, rowid),
+        )
+
+    def add_papers(self, entries: list[dict]):
+        """Index the metadata of papers returned by an arXiv search."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for entry in entries:
+                    url = entry.get("pdf") or entry.get("id")
+                    if not url:
+                        continue
+                    meta = {k: entry.get(k) for k in
+                            ("id", "categories", "primary_category", "published")}
+                    self._upsert(
+                        conn,
+                        paper_key(entry.get("id") or url),
+                        url,
+                        " ".join((entry.get("title") or "").split()),
+                        ", ".join(a for a in entry.get("authors", []) if a),
+                        entry.get("summary") or "",
+                        None,
+                        json.dumps(meta),
+                    )
+
+    def add_text(self, url: str, pages: list[str]):
+        """Index the extracted full text of a paper read from a URL."""
+        body = "\n".join(pages)
+        key = paper_key(url)
+        with self._lock:
+            conn = self._connect()
+            row = self._get(conn, key)
+            if row is not None and row[5] and len(row[5]) == len(body):
+                return
+            with conn:
+                self._upsert(conn, key, url, None, None, None, body, None)
+
+    def search(self, query: str, limit: int = 5) -> list[dict]:
+        """Rank indexed papers against a free-text query with BM25."""
+        terms = re.findall(r'\w+', query.lower())
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with self._lock:
+            rows = self._connect().execute(
+                """
+                SELECT url, title, authors, summary, meta, body IS NOT NULL AND body != '',
+                       snippet(papers, 5, '[', ']', ' ... ', 24),
+                       bm25(papers, 0, 0, 10.0, 2.0, 5.0, 1.0) AS score
+                FROM papers WHERE papers MATCH ? ORDER BY score LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+        return [{
+            "url": url,
+            "title": title,
+            "authors": authors,
+            "summary": summary,
+            **json.loads(meta or "{}"),
+            "full_text_indexed": bool(has_body),
+            "snippet": snippet if has_body else "",
+            "score": round(-score, 3),
+        } for url, title, authors, summary, meta, has_body, snippet, score in rows]
+
+
+paper_index = PaperIndex(os.getenv("PAPER_INDEX_PATH", "cache/papers.db"))
+
+
+from langchain_core.tools import tool
+
+
+@tool
+def search_local_papers(query: str) -> list[dict]:
+    """Search the local library of papers that were already found or read.
+
+    Much faster than arxiv_search or read_pdf. Use it first when the user
+    returns to a topic or paper that was discussed before.
+
+    Args:
+        query: Keywords to search for in titles, abstracts and full texts.
+
+    Returns:
+        Matching papers ranked by relevance, with a text snippet for papers
+        whose full text has been read.
+    """
+    print(f"Searching local paper index for: {query}")
+    results = paper_index.search(query)
+    print(f"Found {len(results)} local papers for {query}")
+    return results
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+
+class PdfCache:
+    """Persistent on-disk cache for downloaded PDFs and their extracted text.
+
+    Raw PDFs and per-page text are stored content-addressed (by SHA-256 of the
+    PDF bytes), so two URLs serving the same file share one entry. A small JSON
+    index maps each URL to its content hash plus the ETag/Last-Modified
+    validators needed to revalidate it. Total blob size is bounded and the
+    least recently used entries are evicted first.
+
+    Several server processes may share one cache directory: every index
+    update re-reads the index (if another process changed it) and saves it
+    while holding an exclusive lock on the directory.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_age: float):
+        self.cache_dir = Path(cache_dir).absolute()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.index_file = self.cache_dir / "index.json"
+        self.lock_file = self.cache_dir / "index.lock"
+        self._lock = threading.Lock()
+        self._index = None
+        self._index_version = None
+
+    # Index handling
+    @contextmanager
+    def _locked(self):
+        """Exclusive access to the index, across threads and processes."""
+        with self._lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_file, "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                yield  # closing the file releases the lock
+
+    def _file_version(self):
+        try:
+            stat = self.index_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_index(self) -> dict:
+        # Re-read whenever another process has saved the index since we last did
+        version = self._file_version()
+        if self._index is None or version != self._index_version:
+            try:
+                self._index = json.loads(self.index_file.read_text())
+            except (OSError, ValueError):
+                self._index = {"urls": {}, "blobs": {}}
+            self._index_version = version
+        return self._index
+
+    def _save_index(self):
+        tmp_file = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_text(json.dumps(self._index))
+        tmp_file.replace(self.index_file)
+        self._index_version = self._file_version()
+
+    def _blob_paths(self, content_hash: str) -> tuple[Path, Path]:
+        return (self.cache_dir / f"{content_hash}.pdf",
+                self.cache_dir / f"{content_hash}.json")
+
+    # Public API
+    def lookup(self, url: str) -> dict | None:
+        """Return the index entry for a URL, or None if it is not cached."""
+        with self._locked():
+            index = self._load_index()
+            entry = index["urls"].get(url)
+            if entry is None or entry["hash"] not in index["blobs"]:
+                return None
+            return dict(entry)
+
+    def is_fresh(self, entry: dict) -> bool:
+        """Whether an entry can be served without revalidating upstream."""
+        return time.time() - entry["validated_at"] < self.max_age
+
+    def revalidation_headers(self, entry: dict | None) -> dict:
+        """Conditional request headers for a cached entry."""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load_pages(self, url: str) -> list[str] | None:
+        """Load the extracted per-page text for a URL and mark it recently used."""
+        with self._locked():
+            index = self._load_index()
+            entry = index["urls"].get(url)
+            if entry is None:
+                return None
+            _, text_path = self._blob_paths(entry["hash"])
+            try:
+                pages = json.loads(text_path.read_text())
+            except (OSError, ValueError):
+                # Blob vanished or is corrupt - forget it so it gets refetched
+                self._drop_blob(entry["hash"])
+                self._save_index()
+                return None
+            index["blobs"][entry["hash"]]["last_access"] = time.time()
+            self._save_index()
+            return pages
+
+    def load_pdf(self, url: str) -> bytes | None:
+        """Load the raw PDF bytes for a URL, if cached."""
+        entry = self.lookup(url)
+        if entry is None:
+            return None
+        pdf_path, _ = self._blob_paths(entry["hash"])
+        try:
+            return pdf_path.read_bytes()
+        except OSError:
+            return None
+
+    def mark_validated(self, url: str):
+        """Record a successful revalidation (HTTP 304) for a URL."""
+        with self._locked():
+            index = self._load_index()
+            if url in index["urls"]:
+                index["urls"][url]["validated_at"] = time.time()
+                self._save_index()
+
+    def pages_for_content(self, content: bytes) -> list[str] | None:
+        """Return cached page text for PDF bytes already seen under another URL."""
+        content_hash = hashlib.sha256(content).hexdigest()
+        with self._locked():
+            if content_hash not in self._load_index()["blobs"]:
+                return None
+        _, text_path = self._blob_paths(content_hash)
+        try:
+            return json.loads(text_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url: str, content: bytes, pages: list[str],
+              etag: str | None = None, last_modified: str | None = None):
+        """Store a downloaded PDF and its extracted pages, then evict if needed."""
+        content_hash = hashlib.sha256(content).hexdigest()
+        with self._locked():
+            index = self._load_index()
+            pdf_path, text_path = self._blob_paths(content_hash)
+            # The blob may be listed but gone (e.g. removed by hand); write it again then
+            if content_hash not in index["blobs"] or not (pdf_path.exists() and text_path.exists()):
+                self._write_file(pdf_path, content)
+                self._write_file(text_path, json.dumps(pages).encode("utf-8"))
+            try:
+                size = pdf_path.stat().st_size + text_path.stat().st_size
+            except OSError as e:
+                print(f"Could not cache PDF for {url}: {str(e)}")
+                self._drop_blob(content_hash)
+                self._save_index()
+                return
+            index["blobs"][content_hash] = {"size": size, "last_access": time.time()}
+            index["urls"][url] = {
+                "hash": content_hash,
+                "etag": etag,
+                "last_modified": last_modified,
+                "validated_at": time.time(),
+            }
+            self._evict()
+            self._save_index()
+
+    @staticmethod
+    def _write_file(path: Path, data: bytes):
+        # Written aside and renamed, so readers never see a partial file
+        tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_file.write_bytes(data)
+        tmp_file.replace(path)
+
+    def clear(self):
+        """Remove every cached entry."""
+        with self._locked():
+            index = self._load_index()
+            for content_hash in list(index["blobs"]):
+                self._drop_blob(content_hash)
+            self._save_index()
+
+    # Eviction
+    def _drop_blob(self, content_hash: str):
+        index = self._index
+        index["blobs"].pop(content_hash, None)
+        for url in [u for u, e in index["urls"].items() if e["hash"] == content_hash]:
+            del index["urls"][url]
+        for path in self._blob_paths(content_hash):
+            path.unlink(missing_ok=True)
+
+    def _evict(self):
+        blobs = self._index["blobs"]
+        total = sum(b["size"] for b in blobs.values())
+        for content_hash in sorted(blobs, key=lambda h: blobs[h]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= blobs[content_hash]["size"]
+            print(f"Evicting cached PDF {content_hash[:12]} from {self.cache_dir}")
+            self._drop_blob(content_hash)
+
+
+pdf_cache = PdfCache(
+    cache_dir=os.getenv("PDF_CACHE_DIR", "cache/pdfs"),
+    max_bytes=int(os.getenv("PDF_CACHE_MAX_BYTES", str(500 * 1024 * 1024))),
+    max_age=float(os.getenv("PDF_CACHE_MAX_AGE", str(24 * 60 * 60))),
+)
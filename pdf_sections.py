@@ -0,0 +1,165 @@
+import re
+from typing import Iterable
+
+
+# Canonical section name -> heading words that introduce it
+SECTION_ALIASES = {
+    "abstract": ["abstract"],
+    "introduction": ["introduction", "background", "motivation"],
+    "related work": ["related work", "prior work", "literature review"],
+    "method": ["method", "methods", "methodology", "approach",
+               "proposed method", "our approach", "preliminaries"],
+    "experiments": ["experiments", "experimental setup", "experimental results",
+                    "evaluation"],
+    "results": ["results", "results and discussion", "analysis"],
+    "discussion": ["discussion", "limitations"],
+    "conclusion": ["conclusion", "conclusions", "concluding remarks",
+                   "summary and conclusion", "future work", "conclusion and future work"],
+    "references": ["references", "bibliography"],
+    "appendix": ["appendix", "supplementary material"],
+}
+
+# Sections returned first when no explicit selection is made
+DEFAULT_PRIORITY = ["abstract", "introduction", "method", "conclusion",
+                    "results", "experiments", "discussion", "related work"]
+
+# Rough characters-per-token ratio used for budgeting
+CHARS_PER_TOKEN = 4
+
+_ALIAS_TO_SECTION = {alias: name for name, aliases in SECTION_ALIASES.items()
+                     for alias in aliases}
+# "methods", "methods:2" or a handle as listed, e.g. "method:2 (part 2 of 3)"
+_REQUEST_RE = re.compile(r'^\s*(.*?)\s*(?::\s*(\d+))?\s*(?:\(.*\))?\s*$')
+
+# Optional numbering ("1", "2.", "IV.", "A") followed by a short heading line
+_HEADING_RE = re.compile(
+    r'^\s*(?:(?:\d+|[IVX]+|[A-Z])\.?\s+)?([A-Za-z][A-Za-z ]{2,40}?)\s*:?\s*$'
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _match_heading(line: str) -> str | None:
+    match = _HEADING_RE.match(line)
+    if not match:
+        return None
+    return _ALIAS_TO_SECTION.get(match.group(1).strip().lower())
+
+
+def split_sections(pages: Iterable[str]) -> dict[str, str]:
+    """Split a paper's pages into canonical sections, in a single pass over the pages.
+
+    Text before the first recognised heading is kept as "front matter". Later
+    headings with the same canonical name (e.g. "Results" after "Analysis")
+    are appended to the existing section.
+    """
+    sections: dict[str, list[str]] = {"front matter": []}
+    current = "front matter"
+    for page in pages:
+        for line in page.splitlines():
+            name = _match_heading(line)
+            if name is not None:
+                current = name
+                sections.setdefault(current, [])
+                continue
+            # "Abstract—We propose ..." style inline abstracts
+            if current == "front matter" and re.match(r'^\s*abstract\W', line, re.IGNORECASE):
+                current = "abstract"
+                sections.setdefault(current, [])
+                line = re.sub(r'^\s*abstract\W+', '', line, flags=re.IGNORECASE)
+            sections[current].append(line)
+    return {name: "\n".join(lines).strip()
+            for name, lines in sections.items() if "".join(lines).strip()}
+
+
+def resolve_section(name: str) -> str:
+    """Canonical section name for a requested name, e.g. "Methods" -> "method"."""
+    name = " ".join(name.lower().split())
+    if name in SECTION_ALIASES or name == "front matter":
+        return name
+    return _ALIAS_TO_SECTION.get(name, name)
+
+
+def parse_section_request(request: str) -> tuple[str, int]:
+    """Split a request such as "methods:2" into a canonical section name and a 1-based part."""
+    match = _REQUEST_RE.match(request)
+    return resolve_section(match.group(1)), int(match.group(2) or 1)
+
+
+def split_parts(text: str, part_tokens: int) -> list[str]:
+    """Split a section into parts of at most `part_tokens`, preferring line or word breaks."""
+    limit = max(part_tokens, 1) * CHARS_PER_TOKEN
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", limit // 2, limit)
+        if cut == -1:
+            cut = text.rfind(" ", limit // 2, limit)
+        if cut == -1:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    parts.append(text)
+    return parts
+
+
+def _label(name: str, part: int, total: int) -> str:
+    return name if total == 1 else f"{name} (part {part} of {total})"
+
+
+def _handle(name: str, part: int, total: int) -> str:
+    """How to ask for the unread remainder of a section in a follow-up call."""
+    if total == 1:
+        return name
+    if part == 1:
+        return f"{name} ({total} parts)"
+    return f"{name}:{part} (part {part} of {total})"
+
+
+def select_sections(sections: dict[str, str], wanted: list[str] | None, max_tokens: int,
+                    part_tokens: int | None = None) -> tuple[list[tuple[str, str]], list[str], list[str]]:
+    """Pick sections to return within a token budget.
+
+    Sections longer than `part_tokens` (default: half the budget) are split
+    into numbered parts, requested as "name:part". A requested section is
+    returned from that part on for as long as the budget lasts; the default
+    selection returns the first part of each priority section that fits.
+
+    Returns the (label, text) pairs selected, handles for the unread
+    sections and parts, and the requests that match no section or part.
+    """
+    part_tokens = part_tokens or max(max_tokens // 2, 1)
+    parts = {name: split_parts(text, part_tokens) for name, text in sections.items()}
+    missing = []
+    if wanted:
+        requests = []
+        for request in wanted:
+            name, part = parse_section_request(request)
+            if name in parts and 1 <= part <= len(parts[name]):
+                requests.append((name, part))
+            else:
+                missing.append(request)
+    else:
+        order = [name for name in DEFAULT_PRIORITY if name in parts]
+        if not order and "front matter" in parts:
+            order = ["front matter"]
+        requests = [(name, 1) for name in order]
+
+    selected = []
+    next_part = {}
+    remaining = max_tokens
+    for name, part in requests:
+        total = len(parts[name])
+        last = total if wanted else part
+        for index in range(max(part, next_part.get(name, 1)), last + 1):
+            text = parts[name][index - 1]
+            if selected and estimate_tokens(text) > remaining:
+                break
+            selected.append((_label(name, index, total), text))
+            remaining -= estimate_tokens(text)
+            next_part[name] = index + 1
+
+    more = [_handle(name, next_part.get(name, 1), len(parts[name]))
+            for name in sections if next_part.get(name, 1) <= len(parts[name])]
+    return selected, more, missing
@@ -1,31 +1,217 @@
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 import io
 import PyPDF2
-import requests
+import http_client
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pdf_cache import pdf_cache
+from paper_index import paper_index
+from pdf_sections import split_sections, select_sections
+from telemetry import timed
+
+
+# Documents shorter than this are extracted serially; pool startup and
+# re-parsing the PDF in each worker would cost more than it saves.
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+SECTION_TOKEN_BUDGET = int(os.getenv("PDF_SECTION_TOKEN_BUDGET", "3000"))
+EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def _extract_page_range(content: bytes, start: int, stop: int) -> list[str]:
+    """Extract pages [start, stop) of a PDF. Runs inside a worker process."""
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+    return [pdf_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def extract_pages(content: bytes) -> list[str]:
+    """Extract the text of every page of a PDF.
+
+    Large documents are split into contiguous page ranges that are extracted
+    in parallel on a process pool; small ones are extracted serially.
+    """
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+    num_pages = len(pdf_reader.pages)
+
+    if num_pages < PARALLEL_MIN_PAGES or EXTRACT_WORKERS < 2:
+        print(f"Extracting text from {num_pages} pages serially")
+        return [page.extract_text() or "" for page in pdf_reader.pages]
+
+    chunk_size = -(-num_pages // EXTRACT_WORKERS)
+    ranges = [(start, min(start + chunk_size, num_pages))
+              for start in range(0, num_pages, chunk_size)]
+    print(f"Extracting text from {num_pages} pages across {len(ranges)} workers")
+    try:
+        executor = _get_executor()
+        futures = [executor.submit(_extract_page_range, content, start, stop)
+                   for start, stop in ranges]
+        pages = []
+        for future in futures:
+            pages.extend(future.result())
+        return pages
+    except BrokenProcessPool as e:
+        print(f"Extraction pool failed ({e}), falling back to serial extraction")
+        _reset_executor()
+        return [page.extract_text() or "" for page in pdf_reader.pages]
+
+
+def fetch_pdf_pages(url: str) -> list[str]:
+    """Return the per-page text of a PDF and add it to the local paper index."""
+    pages = _load_pdf_pages(url)
+    try:
+        paper_index.add_text(url, pages)
+    except Exception as e:
+        print(f"Could not index PDF text: {str(e)}")
+    return pages
+
+
+def _load_pdf_pages(url: str) -> list[str]:
+    """Return the per-page text of a PDF, using the on-disk cache when possible.
+
+    A fresh cache hit skips the network entirely. A stale hit is revalidated
+    with ETag/Last-Modified and only re-downloaded if the server reports a change.
+    """
+    entry = pdf_cache.lookup(url)
+    if entry and pdf_cache.is_fresh(entry):
+        pages = pdf_cache.load_pages(url)
+        if pages is not None:
+            print(f"Using cached PDF text for {url}")
+            return pages
+
+    with timed("pdf_download"):
+        response = http_client.get(url, headers=pdf_cache.revalidation_headers(entry))
+    if response.status_code == 304:
+        pages = pdf_cache.load_pages(url)
+        if pages is not None:
+            print(f"Cached PDF for {url} is still valid")
+            pdf_cache.mark_validated(url)
+            return pages
+        with timed("pdf_download"):
+            response = http_client.get(url)
+    response.raise_for_status()
+
+    pages = pdf_cache.pages_for_content(response.content)
+    if pages is None:
+        with timed("pdf_extract", bytes=len(response.content)):
+            pages = extract_pages(response.content)
+    pdf_cache.store(
+        url,
+        response.content,
+        pages,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+    return pages
+
+
+def _duplicate_note(duplicate: dict) -> str:
+    return (f"Skipped: this paper is a near-duplicate ({duplicate['similarity']:.0%} similar) of "
+            f"\"{duplicate['title'] or duplicate['url']}\" ({duplicate['url']}), which was already "
+            f"read in this conversation. Call again with force=true to read it anyway.")
+
+
+def _read_new_paper(url: str, force: bool, config: RunnableConfig | None) -> tuple[list[str] | None, str | None]:
+    """Fetch a paper's pages unless it nearly duplicates one already read in this conversation.
+
+    Returns (pages, None), or (None, note) when the paper was skipped.
+    """
+    from near_duplicates import duplicate_tracker, thread_of
+
+    thread = thread_of(config)
+    if not force:
+        # Known abstract: decide before downloading anything
+        duplicate = duplicate_tracker.read_duplicate(thread, url)
+        if duplicate:
+            print(f"Skipping {url}: near-duplicate of {duplicate['url']}")
+            return None, _duplicate_note(duplicate)
+    pages = fetch_pdf_pages(url)
+    if not force:
+        duplicate = duplicate_tracker.text_duplicate(thread, url, pages)
+        if duplicate:
+            print(f"Skipping {url}: text nearly matches {duplicate['url']}")
+            return None, _duplicate_note(duplicate)
+    duplicate_tracker.mark_read(thread, url, pages)
+    return pages, None
 
 
 @tool
-def read_pdf(url: str) -> str:
+def read_pdf(url: str, force: bool = False, config: RunnableConfig = None) -> str:
     """Read and extract text from a PDF file given its URL.
 
     Args:
         url: The URL of the PDF file to read
+        force: Read the paper even if it nearly duplicates one already read
 
     Returns:
         The extracted text content from the PDF
     """
     try:
-        response = requests.get(url)
-        pdf_file = io.BytesIO(response.content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        num_pages = len(pdf_reader.pages)
-        text = ""
-        for i, page in enumerate(pdf_reader.pages, 1):
-            print(f"Extracting text from page {i}/{num_pages}")
-            text += page.extract_text() + "\n"
+        pages, note = _read_new_paper(url, force, config)
+        if note:
+            return note
+        text = "\n".join(pages)
 
         print(f"Successfully extracted {len(text)} characters of text from PDF")
         return text.strip()
     except Exception as e:
         print(f"Error reading PDF: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+@tool
+def read_pdf_sections(url: str, sections: str = "", force: bool = False,
+                      config: RunnableConfig = None) -> str:
+    """Read only the most relevant sections of a PDF paper, within a size budget.
+
+    Prefer this over read_pdf for long papers. By default it returns the
+    abstract, introduction, method and conclusion, and lists the other sections
+    that can be fetched with a follow-up call using the same URL. Long sections
+    come in numbered parts; ask for "method:2" to continue where part 1 ended.
+
+    Args:
+        url: The URL of the PDF file to read. Reuse it to fetch more sections later.
+        sections: Optional comma-separated section names or parts to fetch,
+                  e.g. "results, discussion" or "method:2". Leave empty for the default selection.
+        force: Read the paper even if it nearly duplicates one already read
+
+    Returns:
+        The selected sections of the paper and the names of the remaining ones.
+    """
+    try:
+        pages, note = _read_new_paper(url, force, config)
+        if note:
+            return note
+        paper_sections = split_sections(pages)
+        wanted = [name.strip() for name in sections.split(",") if name.strip()]
+        selected, more, missing = select_sections(paper_sections, wanted, SECTION_TOKEN_BUDGET)
+
+        parts = [f"## {name.title()}\n{text}" for name, text in selected]
+        if missing:
+            parts.append(f"Sections not found: {', '.join(missing)}")
+        if more:
+            parts.append(f"More sections available for {url}: {', '.join(more)}")
+
+        print(f"Returning {len(selected)} of {len(paper_sections)} sections from PDF")
+        return "\n\n".join(parts)
+    except Exception as e:
+        print(f"Error reading PDF: {str(e)}")
+        raise
@@ -0,0 +1,64 @@
+import re
+import numpy as np
+
+
+# BM25 parameters; title matches count more than summary matches
+BM25_K1 = 1.5
+BM25_B = 0.75
+FIELD_WEIGHTS = {"title": 2.0, "summary": 1.0}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that the their this to
+via we with using based towards toward new study paper approach method methods
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens without stopwords."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def _term_matrix(docs: list[list[str]], vocabulary: dict) -> np.ndarray:
+    """Documents x vocabulary matrix of term counts."""
+    rows, cols = [], []
+    for row, tokens in enumerate(docs):
+        for token in tokens:
+            col = vocabulary.get(token)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    counts = np.zeros((len(docs), len(vocabulary)), dtype=np.float64)
+    np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+    return counts
+
+
+def _bm25(docs: list[list[str]], query: list[str], k1: float = BM25_K1, b: float = BM25_B) -> np.ndarray:
+    """BM25 score of every document for the query."""
+    vocabulary = {term: i for i, term in enumerate(dict.fromkeys(query))}
+    if not docs or not vocabulary:
+        return np.zeros(len(docs))
+    tf = _term_matrix(docs, vocabulary)
+    lengths = np.array([len(tokens) for tokens in docs], dtype=np.float64)
+    avg_length = lengths.mean() or 1.0
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((len(docs) - df + 0.5) / (df + 0.5))
+    norm = k1 * (1.0 - b + b * lengths / avg_length)
+    weights = tf * (k1 + 1.0) / (tf + norm[:, None])
+    query_counts = np.bincount([vocabulary[t] for t in query], minlength=len(vocabulary))
+    return weights @ (idf * query_counts)
+
+
+def rank_papers(topic: str, entries: list[dict], top_k: int) -> list[dict]:
+    """Return the `top_k` entries most relevant to `topic`, best first, with a "score".
+
+    Entries are scored with BM25 over their title and summary (titles weighted
+    higher); ties keep arXiv's original order.
+    """
+    query = tokenize(topic.replace("+", " "))
+    scores = np.zeros(len(entries))
+    for field, weight in FIELD_WEIGHTS.items():
+        scores += weight * _bm25([tokenize(entry.get(field) or "") for entry in entries], query)
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [{**entries[i], "score": round(float(scores[i]), 3)} for i in order]
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+
+
+class RenderCache:
+    """On-disk memo of LaTeX renders keyed by the hash of the sanitized source.
+
+    Successful renders keep a copy of the PDF; failed renders keep the
+    parsed error message returned to the model for `error_ttl` seconds, so
+    a failure caused by something outside the source is eventually retried.
+    Total size is bounded and the least recently used entries are evicted
+    first.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, error_ttl: float):
+        self.cache_dir = Path(cache_dir).absolute()
+        self.max_bytes = max_bytes
+        self.error_ttl = error_ttl
+        self.index_file = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+        self._index = None
+
+    @staticmethod
+    def key(latex_content: str) -> str:
+        return hashlib.sha256(latex_content.encode("utf-8")).hexdigest()
+
+    def _load_index(self) -> dict:
+        if self._index is None:
+            try:
+                self._index = json.loads(self.index_file.read_text())
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps(self._index))
+        tmp_file.replace(self.index_file)
+
+    def _pdf_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pdf"
+
+    def lookup(self, key: str) -> dict | None:
+        """Return {"pdf": Path} or {"error": str} for a source hash, if cached."""
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            expired = (entry.get("error") is not None
+                       and time.time() - entry.get("created", 0) > self.error_ttl)
+            if expired or (entry.get("error") is None and not self._pdf_path(key).exists()):
+                del index[key]
+                self._save_index()
+                return None
+            entry["last_access"] = time.time()
+            self._save_index()
+            if entry.get("error") is not None:
+                return {"error": entry["error"]}
+            return {"pdf": self._pdf_path(key)}
+
+    def store_pdf(self, key: str, pdf_path: Path):
+        """Remember a successful render."""
+        with self._lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(pdf_path, self._pdf_path(key))
+            self._load_index()[key] = {
+                "error": None,
+                "size": self._pdf_path(key).stat().st_size,
+                "last_access": time.time(),
+            }
+            self._evict()
+            self._save_index()
+
+    def store_error(self, key: str, error: str):
+        """Remember that a source fails to compile, with the error shown to the model."""
+        with self._lock:
+            now = time.time()
+            self._load_index()[key] = {
+                "error": error,
+                "size": len(error),
+                "created": now,
+                "last_access": now,
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        index = self._index
+        total = sum(e["size"] for e in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= index.pop(key)["size"]
+            self._pdf_path(key).unlink(missing_ok=True)
+
+
+render_cache = RenderCache(
+    cache_dir=os.getenv("RENDER_CACHE_DIR", "cache/renders"),
+    max_bytes=int(os.getenv("RENDER_CACHE_MAX_BYTES", str(200 * 1024 * 1024))),
+    error_ttl=float(os.getenv("RENDER_CACHE_ERROR_TTL", str(60 * 60))),
+)
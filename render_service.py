@@ -0,0 +1,180 @@
+import os
+import uuid
+import queue
+import shutil
+import tempfile
+import threading
+import subprocess
+import contextvars
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from telemetry import timed
+
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+# Jobs waiting beyond this are rejected instead of piling up
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", "8"))
+# How long a new job may wait for a queue slot before being rejected
+RENDER_QUEUE_WAIT = float(os.getenv("RENDER_QUEUE_WAIT", "10"))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "180"))
+# Shared tectonic bundle/format cache so every job starts warm
+TECTONIC_CACHE_DIR = os.getenv("TECTONIC_CACHE_DIR", "cache/tectonic")
+
+_WARMUP_DOCUMENT = r"""\documentclass[12pt]{article}
+\usepackage{amsmath}
+\usepackage{amssymb}
+\usepackage{hyperref}
+\usepackage{graphicx}
+\usepackage[margin=1in]{geometry}
+\begin{document}
+Warm-up $E = mc^2$.
+\end{document}
+"""
+
+
+class RenderQueueFull(Exception):
+    """Raised when the render queue is at capacity."""
+
+
+@dataclass
+class RenderResult:
+    returncode: int
+    stdout: str
+    stderr: str
+    pdf_path: Path | None
+    tex_path: Path | None
+
+
+class RenderService:
+    """Bounded pool of tectonic workers fed from a bounded queue.
+
+    Every job compiles in its own scratch directory, so concurrent renders
+    never see each other's files, and the finished .tex/.pdf pair is moved
+    into `output_dir` under a unique name.
+    """
+
+    def __init__(self, output_dir: str = "output", workers: int = RENDER_WORKERS,
+                 queue_size: int = RENDER_QUEUE_SIZE, queue_wait: float = RENDER_QUEUE_WAIT,
+                 timeout: float = RENDER_TIMEOUT,
+                 cache_dir: str = TECTONIC_CACHE_DIR):
+        self.output_dir = Path(output_dir).absolute()
+        self.scratch_root = self.output_dir / ".build"
+        self.cache_dir = Path(cache_dir).absolute()
+        self.workers = workers
+        self.queue_wait = queue_wait
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def _env(self) -> dict:
+        env = dict(os.environ)
+        env["TECTONIC_CACHE_DIR"] = str(self.cache_dir)
+        return env
+
+    def start(self):
+        """Start the worker threads (idempotent) and warm the tectonic cache."""
+        with self._start_lock:
+            if self._threads:
+                return
+            self.output_dir.mkdir(exist_ok=True)
+            self.scratch_root.mkdir(exist_ok=True)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for i in range(self.workers):
+                # The first worker warms up before taking jobs, so warm-up counts against the pool
+                thread = threading.Thread(target=self._worker, args=(i == 0,), name=f"render-{i}",
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _warm_up(self):
+        # Populates the bundle and format caches before the first real job
+        try:
+            self._compile(_WARMUP_DOCUMENT, keep=False)
+            print("Tectonic cache warmed up")
+        except Exception as e:
+            print(f"Tectonic warm-up failed: {str(e)}")
+
+    def submit(self, latex_content: str) -> Future:
+        """Queue a LaTeX document for rendering.
+
+        Raises:
+            RenderQueueFull: If no queue slot frees up within `queue_wait` seconds.
+        """
+        self.start()
+        future = Future()
+        try:
+            # The job carries the caller's context so its timings land in the caller's trace
+            self._queue.put((latex_content, future, contextvars.copy_context()), timeout=self.queue_wait)
+        except queue.Full:
+            raise RenderQueueFull(
+                f"Renderer is busy ({self._queue.maxsize} jobs queued)"
+            ) from None
+        return future
+
+    def render(self, latex_content: str) -> RenderResult:
+        """Render a LaTeX document and wait for the result."""
+        return self.submit(latex_content).result()
+
+    def _worker(self, warm_up: bool = False):
+        if warm_up:
+            self._warm_up()
+        while True:
+            latex_content, future, context = self._queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(context.run(self._compile, latex_content))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def _output_paths(self) -> tuple[Path, Path]:
+        # Unique, collision-free names in the shared output directory
+        stem = f"paper_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        return self.output_dir / f"{stem}.tex", self.output_dir / f"{stem}.pdf"
+
+    def publish(self, latex_content: str, pdf_source: Path) -> RenderResult:
+        """Place an already rendered PDF (e.g. from the render cache) in the output directory."""
+        self.output_dir.mkdir(exist_ok=True)
+        final_tex, final_pdf = self._output_paths()
+        final_tex.write_text(latex_content)
+        shutil.copyfile(pdf_source, final_pdf)
+        return RenderResult(0, "", "", final_pdf, final_tex)
+
+    def _compile(self, latex_content: str, keep: bool = True) -> RenderResult:
+        job_dir = Path(tempfile.mkdtemp(prefix="job_", dir=self.scratch_root))
+        try:
+            tex_file = job_dir / "paper.tex"
+            tex_file.write_text(latex_content)
+            try:
+                with timed("tectonic"):
+                    result = subprocess.run(
+                        ["tectonic", tex_file.name, "--outdir", str(job_dir)],
+                        cwd=job_dir,
+                        capture_output=True,
+                        text=True,
+                        timeout=self.timeout,
+                        env=self._env(),
+                    )
+            except subprocess.TimeoutExpired as e:
+                # TimeoutExpired carries bytes even when text=True
+                stdout = e.stdout.decode(errors="replace") if isinstance(e.stdout, bytes) else (e.stdout or "")
+                return RenderResult(-1, stdout, f"error: tectonic timed out after {self.timeout:.0f}s",
+                                    None, None)
+
+            built_pdf = job_dir / "paper.pdf"
+            if not keep or result.returncode != 0 or not built_pdf.exists():
+                return RenderResult(result.returncode, result.stdout, result.stderr, None, None)
+
+            final_tex, final_pdf = self._output_paths()
+            shutil.move(str(tex_file), final_tex)
+            shutil.move(str(built_pdf), final_pdf)
+            return RenderResult(result.returncode, result.stdout, result.stderr, final_pdf, final_tex)
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+
+render_service = RenderService()
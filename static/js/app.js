@@ -121,6 +121,58 @@ function setInputEnabled(enabled) {
     }
 }
 
+// Incrementally render streamed markdown into a message.
+// Text up to the last paragraph break (outside code fences) is parsed once and
+// kept; only the unfinished tail is re-parsed, at most once per animation frame.
+function createStreamRenderer(contentDiv) {
+    const stableDiv = document.createElement('div');
+    const tailDiv = document.createElement('div');
+    contentDiv.innerHTML = '';
+    contentDiv.appendChild(stableDiv);
+    contentDiv.appendChild(tailDiv);
+    
+    let text = '';
+    let stableLength = 0;
+    let framePending = false;
+    
+    function stableBoundary() {
+        const boundary = text.lastIndexOf('\n\n');
+        if (boundary <= stableLength) return stableLength;
+        // Don't split inside an open ``` block
+        const fences = (text.slice(0, boundary).match(/```/g) || []).length;
+        return fences % 2 === 0 ? boundary + 2 : stableLength;
+    }
+    
+    function render() {
+        framePending = false;
+        const boundary = stableBoundary();
+        if (boundary > stableLength) {
+            stableDiv.insertAdjacentHTML('beforeend', marked.parse(text.slice(stableLength, boundary)));
+            stableLength = boundary;
+        }
+        tailDiv.innerHTML = marked.parse(text.slice(stableLength));
+        scrollToBottom();
+    }
+    
+    return {
+        append(delta) {
+            text += delta;
+            if (!framePending) {
+                framePending = true;
+                requestAnimationFrame(render);
+            }
+        },
+        // Replace the streamed text with the complete message
+        finalize(fullText) {
+            text = fullText;
+            stableLength = 0;
+            stableDiv.innerHTML = '';
+            tailDiv.innerHTML = marked.parse(fullText);
+            scrollToBottom();
+        }
+    };
+}
+
 // Send message using Server-Sent Events (streaming)
 async function sendMessageStream(message) {
     removeWelcomeMessage();
@@ -153,17 +205,34 @@ async function sendMessageStream(message) {
         const reader = response.body.getReader();
         const decoder = new TextDecoder();
         
-        let currentContent = '';
+        let buffer = '';
         let pdfFilename = null;
         let messageDiv = null;
+        let renderer = null;
+        // Set once a message is complete, so the next tokens start a new block
+        let startNewBlock = true;
+        
+        // Create the assistant message on first output and return its renderer
+        function ensureRenderer() {
+            removeLoadingIndicator();
+            if (!messageDiv) {
+                messageDiv = addMessage('assistant', '');
+            }
+            if (!renderer) {
+                renderer = createStreamRenderer(messageDiv.querySelector('.message-content'));
+            }
+            return renderer;
+        }
         
         while (true) {
             const { done, value } = await reader.read();
             
             if (done) break;
             
-            const chunk = decoder.decode(value);
-            const lines = chunk.split('\n');
+            // Events can be split across reads; keep the trailing partial line
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
             
             for (const line of lines) {
                 if (line.startsWith('data: ')) {
@@ -173,20 +242,24 @@ async function sendMessageStream(message) {
                         switch (data.type) {
                             case 'tool_call':
                                 addToolIndicator(data.name);
+                                startNewBlock = true;
                                 break;
                                 
-                            case 'content':
-                                currentContent = data.content;
-                                
-                                // Remove loading indicator and create/update message
-                                removeLoadingIndicator();
+                            case 'delta':
+                                if (startNewBlock) {
+                                    renderer = null;
+                                    startNewBlock = false;
+                                }
+                                ensureRenderer().append(data.content);
+                                break;
                                 
-                                if (!messageDiv) {
-                                    messageDiv = addMessage('assistant', currentContent);
-                                } else {
-                                    const contentDiv = messageDiv.querySelector('.message-content');
-                                    contentDiv.innerHTML = marked.parse(currentContent);
+                            case 'content':
+                                // Full message text: replaces what was streamed
+                                if (startNewBlock) {
+                                    renderer = null;
                                 }
+                                ensureRenderer().finalize(data.content);
+                                startNewBlock = true;
                                 break;
                                 
                             case 'pdf':
@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import uuid
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+# When set, every traced request is written to this directory as JSON
+TRACE_DIR = os.getenv("TRACE_DIR")
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+TOKENS_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+
+def _label_text(labelnames, values, extra=()) -> str:
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with a fixed label set."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', f'{bound:g}')])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', '+Inf')])} {series['count']}")
+                lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {series['sum']:g}")
+                lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {series['count']}")
+        return lines
+
+
+class Counter:
+    """Prometheus-style monotonically increasing counter."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labelnames, key)} {value:g}")
+        return lines
+
+
+NODE_SECONDS = Histogram("agent_node_duration_seconds", "Time spent in each graph node.", ("node",))
+TOOL_SECONDS = Histogram("agent_tool_duration_seconds", "Time spent in each tool call.", ("tool", "status"))
+STAGE_SECONDS = Histogram("agent_stage_duration_seconds",
+                          "Time spent in stages inside tools (download, extraction, compilation).", ("stage",))
+PAYLOAD_BYTES = Histogram("agent_payload_bytes", "Size of tool inputs and outputs.",
+                          ("tool", "direction"), BYTES_BUCKETS)
+LLM_TOKENS = Histogram("agent_llm_tokens", "Tokens per model call.", ("kind",), TOKENS_BUCKETS)
+LLM_TOKENS_TOTAL = Counter("agent_llm_tokens_total", "Tokens used by all model calls.", ("kind",))
+ERRORS = Counter("agent_errors_total", "Failed nodes, tools and stages.", ("kind", "name"))
+LLM_CACHE_LOOKUPS = Counter("agent_llm_cache_lookups_total", "Model response cache lookups.", ("result",))
+
+METRICS = [NODE_SECONDS, TOOL_SECONDS, STAGE_SECONDS, PAYLOAD_BYTES, LLM_TOKENS, LLM_TOKENS_TOTAL, ERRORS,
+           LLM_CACHE_LOOKUPS]
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+# Per-request traces
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """Timeline of the spans recorded while handling one request."""
+
+    def __init__(self, **attrs):
+        self.id = uuid.uuid4().hex[:12]
+        self.attrs = attrs
+        self.started = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, name: str, start: float, seconds: float, **attrs):
+        span = {"kind": kind, "name": name, "offset_s": round(start - self.started, 4),
+                "duration_s": round(seconds, 4)}
+        span.update({k: v for k, v in attrs.items() if v is not None})
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["offset_s"])
+        return {"id": self.id, **self.attrs, "started": datetime.fromtimestamp(self.started).isoformat(),
+                "duration_s": round(time.time() - self.started, 4), "spans": spans}
+
+    def dump(self, trace_dir: str) -> Path:
+        path = Path(trace_dir) / f"trace_{datetime.fromtimestamp(self.started).strftime('%Y%m%d_%H%M%S')}_{self.id}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+        return path
+
+
+@contextmanager
+def trace(**attrs):
+    """Collect the spans of everything run inside the block into a Trace.
+
+    The trace is written to TRACE_DIR when it is set.
+    """
+    current = Trace(**attrs)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A streaming response's generator may be closed from another context
+            _current_trace.set(None)
+        if TRACE_DIR:
+            try:
+                current.dump(TRACE_DIR)
+            except OSError as e:
+                print(f"Could not write trace: {str(e)}")
+
+
+def _add_span(kind: str, name: str, start: float, seconds: float, **attrs):
+    current = _current_trace.get()
+    if current is not None:
+        current.add(kind, name, start, seconds, **attrs)
+
+
+@contextmanager
+def timed(stage: str, **attrs):
+    """Time a stage inside a tool, e.g. `with timed("pdf_download"): ...`."""
+    start = time.time()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e)}"[:200]
+        ERRORS.inc(kind="stage", name=stage)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        _add_span("stage", stage, start, seconds, error=error, **attrs)
+
+
+def record_error(kind: str, name: str, error: str):
+    """Count an error that did not surface as an exception, e.g. a tool timeout."""
+    ERRORS.inc(kind=kind, name=name)
+    _add_span(kind, name, time.time(), 0.0, error=error)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler timing graph nodes, tool calls and model calls."""
+
+    # Cheap and thread-safe, so async runs call it directly instead of via an executor
+    run_inline = True
+
+    def __init__(self):
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, kind: str, name: str, **attrs):
+        with self._lock:
+            self._runs[run_id] = (kind, name, time.time(), time.perf_counter(), attrs)
+
+    def _finish(self, run_id, error: BaseException | None = None, **attrs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        kind, name, start, started, start_attrs = run
+        seconds = time.perf_counter() - started
+        status = "error" if error is not None else "ok"
+        if error is not None:
+            ERRORS.inc(kind=kind, name=name)
+        if kind == "node":
+            NODE_SECONDS.observe(seconds, node=name)
+        elif kind == "tool":
+            TOOL_SECONDS.observe(seconds, tool=name, status=status)
+        _add_span(kind, name, start, seconds,
+                  error=f"{type(error).__name__}: {str(error)}"[:200] if error is not None else None,
+                  **start_attrs, **attrs)
+        return name
+
+    # Graph nodes are the chain runs LangGraph tags with their step number
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None,
+                       metadata=None, **kwargs):
+        if any(tag.startswith("graph:step:") for tag in tags or ()):
+            self._start(run_id, "node", (metadata or {}).get("langgraph_node") or kwargs.get("name"))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        size = len(input_str.encode("utf-8", "replace"))
+        PAYLOAD_BYTES.observe(size, tool=name, direction="input")
+        self._start(run_id, "tool", name, input_bytes=size)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        content = getattr(output, "content", output)
+        size = len(str(content).encode("utf-8", "replace"))
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run is not None:
+            PAYLOAD_BYTES.observe(size, tool=run[1], direction="output")
+        self._finish(run_id, output_bytes=size)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm", kwargs.get("name") or (serialized or {}).get("name", "chat_model"),
+                    prompt_messages=sum(len(batch) for batch in messages))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = _token_usage(response)
+        if usage:
+            for kind in ("prompt", "completion"):
+                LLM_TOKENS.observe(usage[kind], kind=kind)
+                LLM_TOKENS_TOTAL.inc(usage[kind], kind=kind)
+        self._finish(run_id, **({f"{k}_tokens": v for k, v in usage.items()} if usage else {}))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error)
+
+
+def _token_usage(response) -> dict | None:
+    """Prompt/completion token counts of a model call, if the provider reported them."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {"prompt": usage.get("input_tokens", 0), "completion": usage.get("output_tokens", 0)}
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        return {"prompt": token_usage.get("prompt_tokens", 0),
+                "completion": token_usage.get("completion_tokens", 0)}
+    return None
+
+
+metrics_handler = MetricsCallbackHandler()
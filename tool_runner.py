@@ -0,0 +1,199 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableLambda
+from telemetry import record_error
+
+
+# Maximum number of tool calls running at once, across all sessions
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+# Default per-call timeout in seconds; TOOL_TIMEOUTS overrides it per tool
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "120"))
+TOOL_TIMEOUTS = {
+    # Waits for a render queue slot, then compiles
+    "render_latex_pdf": 300.0,
+}
+
+# A timed-out call cannot be interrupted and keeps its thread until it returns.
+# The pool has this many spare threads for such stranded calls, so up to
+# TOOL_MAX_STRANDED of them do not reduce TOOL_WORKERS; beyond that, new calls
+# wait for a thread.
+TOOL_MAX_STRANDED = int(os.getenv("TOOL_MAX_STRANDED", "4"))
+# How long a call may wait for a free worker before it is given up
+TOOL_QUEUE_TIMEOUT = float(os.getenv("TOOL_QUEUE_TIMEOUT", "300"))
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS + TOOL_MAX_STRANDED, thread_name_prefix="tool")
+# Calls counted against TOOL_WORKERS, from sync and async runs alike; a
+# timed-out call hands its slot back at once
+_slots = threading.BoundedSemaphore(TOOL_WORKERS)
+
+
+class _PooledCall:
+    """A tool call on the shared pool whose timeout clock starts when it starts running."""
+
+    def __init__(self, func, *args, on_start=None):
+        self.func = func
+        self.args = args
+        self.on_start = on_start
+        self.started = threading.Event()
+        self.start_time = None
+        self._holding_slot = False
+        self._abandoned = False
+        self._lock = threading.Lock()
+
+    def run(self):
+        _slots.acquire()
+        with self._lock:
+            if self._abandoned:
+                _slots.release()
+                return None
+            self._holding_slot = True
+            self.start_time = time.monotonic()
+        self.started.set()
+        try:
+            if self.on_start is not None:
+                self.on_start()
+            return self.func(*self.args)
+        finally:
+            self._release_slot()
+
+    def _release_slot(self):
+        with self._lock:
+            holding, self._holding_slot = self._holding_slot, False
+        if holding:
+            _slots.release()
+
+    def abandon(self):
+        """Stop waiting for the call; if it is running, it finishes without holding a slot."""
+        with self._lock:
+            self._abandoned = True
+        self._release_slot()
+
+
+def _error_message(call: dict, error: str) -> ToolMessage:
+    return ToolMessage(content=f"Error: {error}", name=call["name"],
+                       tool_call_id=call["id"], status="error")
+
+
+def _as_message(call: dict, output) -> ToolMessage:
+    if isinstance(output, ToolMessage):
+        return output
+    return ToolMessage(content=str(output), name=call["name"], tool_call_id=call["id"])
+
+
+def _queue_timeout_message(call: dict) -> ToolMessage:
+    print(f"Tool {call['name']} never got a worker")
+    record_error("tool", call["name"], "queue timeout")
+    return _error_message(call, f"{call['name']} could not start because all tool workers are busy. "
+                                f"Please try again later.")
+
+
+def _timeout_message(call: dict, timeout: float) -> ToolMessage:
+    print(f"Tool {call['name']} timed out")
+    record_error("tool", call["name"], "timeout")
+    return _error_message(call, f"{call['name']} timed out after {timeout:g}s.")
+
+
+def _failure_message(call: dict, error: Exception) -> ToolMessage:
+    print(f"Tool {call['name']} failed: {str(error)}")
+    return _error_message(call, f"{str(error)}. Please fix your mistakes.")
+
+
+def make_tool_node(tools: list, timeouts: dict | None = None):
+    """Build a graph node that runs all tool calls of the last AI message concurrently.
+
+    Calls run on a shared bounded thread pool, whether the graph is driven
+    with stream or astream, each with its own timeout counted from when the
+    call starts running. The resulting ToolMessages are returned in the
+    order the calls were made.
+
+    Args:
+        tools: The tools the node can call.
+        timeouts: Per-tool timeouts in seconds, on top of TOOL_TIMEOUTS.
+    """
+    tools_by_name = {t.name: t for t in tools}
+    timeouts = {**TOOL_TIMEOUTS, **(timeouts or {})}
+
+    def timeout_for(name: str) -> float:
+        return timeouts.get(name, TOOL_TIMEOUT)
+
+    def tool_calls(state):
+        return state["messages"][-1].tool_calls
+
+    def pooled_call(call: dict, config, on_start=None) -> _PooledCall:
+        return _PooledCall(contextvars.copy_context().run, tools_by_name[call["name"]].invoke,
+                           {**call, "type": "tool_call"}, config, on_start=on_start)
+
+    # The node's config is passed on so tool runs report to the same callbacks
+    def run_tools(state, config):
+        calls = tool_calls(state)
+        print(f"Running {len(calls)} tool call(s) in parallel")
+        jobs = [pooled_call(call, config) if call["name"] in tools_by_name else None for call in calls]
+        futures = [_executor.submit(job.run) if job else None for job in jobs]
+        queue_deadline = time.monotonic() + TOOL_QUEUE_TIMEOUT
+        messages = []
+        for call, job, future in zip(calls, jobs, futures):
+            if future is None:
+                messages.append(_error_message(call, f"{call['name']} is not a valid tool."))
+                continue
+            # Time spent queued for a worker does not count against the call's timeout
+            if not job.started.wait(max(queue_deadline - time.monotonic(), 0)):
+                job.abandon()
+                future.cancel()
+                messages.append(_queue_timeout_message(call))
+                continue
+            timeout = timeout_for(call["name"])
+            try:
+                output = future.result(timeout=max(timeout - (time.monotonic() - job.start_time), 0))
+                messages.append(_as_message(call, output))
+            except FutureTimeout:
+                job.abandon()
+                messages.append(_timeout_message(call, timeout))
+            except Exception as e:
+                messages.append(_failure_message(call, e))
+        return {"messages": messages}
+
+    # Same pool, slots and timeouts as run_tools; the event loop only waits
+    async def arun_tools(state, config):
+        loop = asyncio.get_running_loop()
+        queue_deadline = time.monotonic() + TOOL_QUEUE_TIMEOUT
+
+        async def run_one(call):
+            if call["name"] not in tools_by_name:
+                return _error_message(call, f"{call['name']} is not a valid tool.")
+            started = loop.create_future()
+
+            def on_start():
+                try:
+                    loop.call_soon_threadsafe(lambda: started.done() or started.set_result(None))
+                except RuntimeError:
+                    pass  # the loop is gone; nobody is waiting any more
+
+            job = pooled_call(call, config, on_start)
+            future = _executor.submit(job.run)
+            try:
+                await asyncio.wait_for(started, max(queue_deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                job.abandon()
+                future.cancel()
+                return _queue_timeout_message(call)
+            timeout = timeout_for(call["name"])
+            try:
+                output = await asyncio.wait_for(asyncio.wrap_future(future),
+                                                max(timeout - (time.monotonic() - job.start_time), 0))
+                return _as_message(call, output)
+            except asyncio.TimeoutError:
+                job.abandon()
+                return _timeout_message(call, timeout)
+            except Exception as e:
+                return _failure_message(call, e)
+
+        calls = tool_calls(state)
+        print(f"Running {len(calls)} tool call(s) in parallel")
+        return {"messages": list(await asyncio.gather(*(run_one(call) for call in calls)))}
+
+    return RunnableLambda(run_tools, afunc=arun_tools, name="tools")
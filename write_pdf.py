@@ -1,89 +1,121 @@
 from langchain_core.tools import tool
-from datetime import datetime
-from pathlib import Path
-import subprocess
+from render_service import render_service, RenderQueueFull
+from render_cache import render_cache
+from latex_lint import lint_latex
+from latex_diagnostics import (parse_tectonic_output, diagnostics_from_lint, format_diagnostics,
+                               is_transient_failure)
+from telemetry import timed
+import os
 import shutil
 import re
 
 
+# Set LATEX_LINT=0 to send documents straight to tectonic without static checks
+LATEX_LINT = os.getenv("LATEX_LINT", "1") != "0"
+
+
+# Rule tables for sanitize_latex. Add entries here to teach the sanitizer new
+# fixes; they are all applied in the same single pass over the document.
+
+# Commands that need a package loaded
+PACKAGE_FOR_COMMAND = {
+    "mathbb": "amssymb",
+    "text": "amsmath",
+    "includegraphics": "graphicx",
+    "href": "hyperref",
+    "url": "hyperref",
+}
+
+# Environments that need a package loaded
+PACKAGE_FOR_ENVIRONMENT = {
+    "split": "amsmath",
+    "align": "amsmath",
+    "align*": "amsmath",
+    "gather": "amsmath",
+    "gather*": "amsmath",
+    "multline": "amsmath",
+    "multline*": "amsmath",
+}
+
+# Undefined shorthand macros LLMs like to use, and their standard spelling
+MACRO_REWRITES = {
+    "R": r"\mathbb{R}",
+    "N": r"\mathbb{N}",
+    "Z": r"\mathbb{Z}",
+    "Q": r"\mathbb{Q}",
+    "C": r"\mathbb{C}",
+}
+
+_LATEX_TOKEN_RE = re.compile(
+    r'(?P<documentclass>^[ \t]*\\documentclass[^\n]*\n)'
+    r'|(?P<usepackage>^[ \t]*\\usepackage(?:\[[^\]\n]*\])?\{(?P<packages>[^}]+)\}[^\n]*(?:\n|$))'
+    r'|\\begin\{(?P<environment>[^}]+)\}'
+    r'|\\(?P<command>[A-Za-z]+)'
+    r'|\\.'
+    r'|%[^\n]*',
+    re.MULTILINE,
+)
+
+
 def sanitize_latex(latex_content: str) -> str:
-    """Clean up common LaTeX issues that LLMs produce."""
-    
+    """Clean up common LaTeX issues that LLMs produce.
+
+    Scans the document once, rewriting shorthand macros, dropping duplicate
+    package declarations and collecting the packages the document needs; any
+    missing ones are inserted right after the documentclass line.
+    """
     # Remove any markdown code block markers
     latex_content = re.sub(r'^```latex\s*', '', latex_content)
     latex_content = re.sub(r'^```\s*', '', latex_content)
     latex_content = re.sub(r'\s*```$', '', latex_content)
-    
-    # Fix common LLM mistakes
-    
-    # Fix \begin{split} without amsmath (add amsmath if not present)
-    if r'\begin{split}' in latex_content or r'\begin{align}' in latex_content:
-        if r'\usepackage{amsmath}' not in latex_content:
-            # Add amsmath after documentclass
-            latex_content = re.sub(
-                r'(\\documentclass[^\n]*\n)',
-                r'\1\\usepackage{amsmath}\n',
-                latex_content
-            )
-    
-    # Fix \mathbb without amssymb
-    if r'\mathbb' in latex_content:
-        if r'\usepackage{amssymb}' not in latex_content:
-            latex_content = re.sub(
-                r'(\\documentclass[^\n]*\n)',
-                r'\1\\usepackage{amssymb}\n',
-                latex_content
-            )
-    
-    # Fix common undefined control sequences
-    # \R, \N, \Z etc. should be \mathbb{R}, \mathbb{N}, \mathbb{Z}
-    latex_content = re.sub(r'\\R(?![a-zA-Z])', r'\\mathbb{R}', latex_content)
-    latex_content = re.sub(r'\\N(?![a-zA-Z])', r'\\mathbb{N}', latex_content)
-    latex_content = re.sub(r'\\Z(?![a-zA-Z])', r'\\mathbb{Z}', latex_content)
-    latex_content = re.sub(r'\\Q(?![a-zA-Z])', r'\\mathbb{Q}', latex_content)
-    latex_content = re.sub(r'\\C(?![a-zA-Z])', r'\\mathbb{C}', latex_content)
-    
-    # Fix \text{} without amsmath
-    if r'\text{' in latex_content:
-        if r'\usepackage{amsmath}' not in latex_content:
-            latex_content = re.sub(
-                r'(\\documentclass[^\n]*\n)',
-                r'\1\\usepackage{amsmath}\n',
-                latex_content
-            )
-    
-    # Add graphicx if \includegraphics is used
-    if r'\includegraphics' in latex_content:
-        if r'\usepackage{graphicx}' not in latex_content:
-            latex_content = re.sub(
-                r'(\\documentclass[^\n]*\n)',
-                r'\1\\usepackage{graphicx}\n',
-                latex_content
-            )
-    
-    # Add hyperref for \href and \url
-    if r'\href' in latex_content or r'\url' in latex_content:
-        if r'\usepackage{hyperref}' not in latex_content:
-            latex_content = re.sub(
-                r'(\\documentclass[^\n]*\n)',
-                r'\1\\usepackage{hyperref}\n',
-                latex_content
-            )
-    
-    # Fix double usepackage declarations
-    lines = latex_content.split('\n')
-    seen_packages = set()
-    cleaned_lines = []
-    for line in lines:
-        match = re.match(r'\\usepackage(\[.*?\])?\{([^}]+)\}', line.strip())
-        if match:
-            package = match.group(2)
-            if package in seen_packages:
-                continue  # Skip duplicate
-            seen_packages.add(package)
-        cleaned_lines.append(line)
-    
-    return '\n'.join(cleaned_lines)
+
+    pieces = []
+    loaded = set()
+    required = []
+    preamble_at = None
+    last_end = 0
+
+    def require(package):
+        if package and package not in required:
+            required.append(package)
+
+    for match in _LATEX_TOKEN_RE.finditer(latex_content):
+        pieces.append(latex_content[last_end:match.start()])
+        last_end = match.end()
+        token = match.group(0)
+
+        if match.group("documentclass"):
+            pieces.append(token)
+            if preamble_at is None:
+                preamble_at = len(pieces)
+                pieces.append("")
+        elif match.group("usepackage"):
+            packages = [p.strip() for p in match.group("packages").split(",")]
+            # Fix double usepackage declarations
+            if match.group("packages") in loaded:
+                continue
+            loaded.add(match.group("packages"))
+            loaded.update(packages)
+            pieces.append(token)
+        elif match.group("environment"):
+            require(PACKAGE_FOR_ENVIRONMENT.get(match.group("environment")))
+            pieces.append(token)
+        elif match.group("command"):
+            command = match.group("command")
+            if command in MACRO_REWRITES:
+                token = MACRO_REWRITES[command]
+                command = re.match(r'\\([A-Za-z]+)', token).group(1)
+            require(PACKAGE_FOR_COMMAND.get(command))
+            pieces.append(token)
+        else:
+            pieces.append(token)
+    pieces.append(latex_content[last_end:])
+
+    missing = [p for p in required if p not in loaded]
+    if missing and preamble_at is not None:
+        pieces[preamble_at] = "".join(f"\\usepackage{{{p}}}\n" for p in missing)
+
+    return "".join(pieces)
 
 
 @tool
@@ -106,27 +138,37 @@ def render_latex_pdf(latex_content: str) -> str:
         # Sanitize the LaTeX content
         latex_content = sanitize_latex(latex_content)
         
-        # Create directory
-        output_dir = Path("output").absolute()
-        output_dir.mkdir(exist_ok=True)
+        # Identical sources (retries, other sessions) reuse the earlier outcome
+        source_key = render_cache.key(latex_content)
+        cached = render_cache.lookup(source_key)
+        if cached and "error" in cached:
+            print("Returning cached compilation error for identical LaTeX source")
+            return cached["error"]
+        if cached:
+            result = render_service.publish(latex_content, cached["pdf"])
+            print(f"Reusing cached PDF for identical LaTeX source at {result.pdf_path}")
+            return str(result.pdf_path)
         
-        # Setup filenames
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        tex_filename = f"paper_{timestamp}.tex"
-        pdf_filename = f"paper_{timestamp}.pdf"
+        # Catch structural errors without spending a tectonic run on them;
+        # possibly undefined names are only warnings and tectonic has the final say
+        lint_warnings = []
+        if LATEX_LINT:
+            with timed("latex_lint"):
+                lint_findings = lint_latex(latex_content)
+            lint_errors = [e for e in lint_findings if e.severity == "error"]
+            lint_warnings = [e for e in lint_findings if e.severity != "error"]
+            if lint_errors:
+                print(f"LaTeX lint found {len(lint_errors)} structural error(s); skipping compilation")
+                return format_diagnostics(diagnostics_from_lint(lint_findings, latex_content))
+            if lint_warnings:
+                print("LaTeX lint warnings (compiling anyway): "
+                      + "; ".join(f"line {w.line}: {w.message}" for w in lint_warnings))
         
-        # Write LaTeX file
-        tex_file = output_dir / tex_filename
-        tex_file.write_text(latex_content)
-        print(f"LaTeX file written to: {tex_file}")
-
-        # Run tectonic and capture output
-        result = subprocess.run(
-            ["tectonic", tex_filename, "--outdir", str(output_dir)],
-            cwd=output_dir,
-            capture_output=True,
-            text=True,
-        )
+        # Compile in an isolated scratch directory on the render pool
+        try:
+            result = render_service.render(latex_content)
+        except RenderQueueFull as e:
+            return f"Error: {str(e)}. Please wait a moment and try again."
 
         # Log stdout and stderr for debugging
         if result.stdout:
@@ -136,36 +178,27 @@ def render_latex_pdf(latex_content: str) -> str:
 
         # Check if tectonic command failed
         if result.returncode != 0:
-            # Extract the error line number and message
-            error_match = re.search(r'error: [^:]+:(\d+): (.+)', result.stderr)
-            if error_match:
-                line_num = int(error_match.group(1))
-                error_msg = error_match.group(2)
-                
-                # Get the problematic line from the LaTeX content
-                lines = latex_content.split('\n')
-                problematic_line = lines[line_num - 1] if line_num <= len(lines) else "Unknown"
-                
-                return (f"LaTeX compilation failed at line {line_num}: {error_msg}\n"
-                        f"Problematic line: {problematic_line}\n"
-                        f"Please fix the LaTeX error and try again. "
-                        f"Common issues: undefined commands, missing packages, or syntax errors.")
-            else:
-                return (f"LaTeX compilation failed: {result.stderr}\n"
-                        f"Please fix the LaTeX errors and try again.")
-
-        final_pdf = output_dir / pdf_filename
-        if not final_pdf.exists():
-            # Check for any PDF files that might have been generated with different name
-            pdf_files = list(output_dir.glob("*.pdf"))
-            if pdf_files:
-                final_pdf = max(pdf_files, key=lambda p: p.stat().st_mtime)
-            else:
-                return "PDF file was not generated. Please check the LaTeX content for errors."
-
-        print(f"Successfully generated PDF at {final_pdf}")
-        return str(final_pdf)
+            # Report every error and warning at once so one retry can fix them all
+            diagnostics = parse_tectonic_output(result.stderr, latex_content)
+            if diagnostics:
+                # Lint warnings may point at the cause; without parsed errors the stderr tail is kept
+                diagnostics += diagnostics_from_lint(lint_warnings, latex_content)
+            error = format_diagnostics(diagnostics, result.stderr)
+            if (any(d.severity == "error" and d.line is not None for d in diagnostics)
+                    and not is_transient_failure(result.stderr)):
+                # Line-level LaTeX errors are deterministic, so the same source will fail again;
+                # failed package downloads and I/O problems may be a network hiccup and are not cached
+                render_cache.store_error(source_key, error)
+            return error
+
+        if result.pdf_path is None:
+            return "PDF file was not generated. Please check the LaTeX content for errors."
+
+        render_cache.store_pdf(source_key, result.pdf_path)
+        print(f"LaTeX file written to: {result.tex_path}")
+        print(f"Successfully generated PDF at {result.pdf_path}")
+        return str(result.pdf_path)
 
     except Exception as e:
         print(f"Error rendering LaTeX: {str(e)}")
-        return f"Error rendering LaTeX: {str(e)}. Please try again with valid LaTeX content."
\ No newline at end of file
+        return f"Error rendering LaTeX: {str(e)}. Please try again with valid LaTeX content."